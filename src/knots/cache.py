@@ -0,0 +1,142 @@
+import hashlib
+import os
+import pathlib
+import tempfile
+from collections.abc import Hashable
+
+import numpy as np
+from matplotlib.path import Path
+
+# bump if the way outlines are computed changes so old entries are not used
+_FORMAT_VERSION = 1
+
+
+def content_key(
+    path: Path,
+    xlimits: tuple[float, float],
+    ylimits: tuple[float, float],
+    params: tuple[Hashable, ...],
+) -> str:
+    """
+    Hash the content of a path, its limits, and the parameters of a product.
+
+    Two knots with equal vertices, codes and limits get the same key no matter
+    how (or in which process) they were made.
+
+    Parameters
+    ----------
+    path : Path
+        The center line of the knot
+
+    xlimits, ylimits : tuple[float, float]
+        The limits of the knot
+
+    params : tuple
+        Everything else the product depends on, numbers are compared by value.
+
+    Returns
+    -------
+    str
+        A hex digest
+    """
+    h = hashlib.sha256(f"knots-{_FORMAT_VERSION}".encode())
+    h.update(np.ascontiguousarray(path.vertices, dtype=np.float64).tobytes())
+    h.update(b"|")
+    if path.codes is not None:
+        h.update(np.ascontiguousarray(path.codes, dtype=np.uint8).tobytes())
+    h.update(b"|")
+    h.update(np.asarray([*xlimits, *ylimits], dtype=np.float64).tobytes())
+    for p in params:
+        # np.float64(7) and 7 should give the same key
+        if isinstance(p, int | float | np.number) and not isinstance(p, bool):
+            h.update(f"|{float(p)!r}".encode())
+        else:
+            h.update(f"|{p!r}".encode())
+    return h.hexdigest()
+
+
+class OutlineCache:
+    """
+    A content addressed cache of outlines in a directory of ``.npz`` files.
+
+    The entries are keyed by `content_key`, so the cache can be shared between
+    runs and by concurrent processes.  Entries are written to a temporary file
+    and atomically renamed into place, so readers only ever see complete
+    files.  Once the directory exceeds *max_bytes* the least recently used
+    entries are removed.
+
+    Parameters
+    ----------
+    directory : str or PathLike
+        Where to store the outlines, created if needed.
+
+    max_bytes : int, default: 256 MiB
+        The size to evict down to.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = 256 * 2**20):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}.npz"
+
+    def get(self, key: str) -> Path | None:
+        """Return the outline stored under *key*, or None."""
+        fname = self._file(key)
+        try:
+            with np.load(fname) as data:
+                verts = data["vertices"]
+                codes = data["codes"]
+        except (OSError, KeyError, ValueError):
+            # missing, evicted by another process, or unreadable
+            return None
+        try:
+            # mark as recently used
+            os.utime(fname)
+        except OSError:
+            pass
+        return Path(verts, codes if len(codes) else None)
+
+    def put(self, key: str, path: Path):
+        """Store *path* under *key* and evict old entries if needed."""
+        codes = (
+            np.zeros(0, dtype=np.uint8)
+            if path.codes is None
+            else np.asarray(path.codes, dtype=np.uint8)
+        )
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False
+        ) as f:
+            np.savez(f, vertices=np.asarray(path.vertices, dtype=float), codes=codes)
+        pathlib.Path(f.name).replace(self._file(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until under *max_bytes*."""
+        entries = []
+        for fname in self.directory.glob("*.npz"):
+            try:
+                st = fname.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+        total = sum(size for _, size, _ in entries)
+        for _, size, fname in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                fname.unlink()
+            except OSError:
+                # already removed by another process
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all of the entries."""
+        for fname in self.directory.glob("*.npz"):
+            try:
+                fname.unlink()
+            except OSError:
+                pass
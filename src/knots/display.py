@@ -1,13 +1,13 @@
 import functools
 import os
-from typing import NamedTuple
+from typing import Literal, NamedTuple
 
 import numpy as np
 from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
 from matplotlib.patches import PathPatch
 
-from knots.path import Knot, as_outline, make_artist
+from knots.path import Knot, as_interlaced, as_outline, make_artist
 
 
 class GuideArtists(NamedTuple):
@@ -25,6 +25,13 @@ class Stage3Artists(NamedTuple):
     center_line: PathPatch
 
 
+class Stage4Artists(NamedTuple):
+    "Artists do display Stage 4"
+
+    outline: PathPatch
+    center_line: PathPatch
+
+
 def _auto_display(func):
     # TODO patch the __signature__
     @functools.wraps(func)
@@ -143,6 +150,7 @@ def generate_stage3(
     center_line: bool = False,
     fig_size: tuple[float, float] | None = None,
     center_alpha: float = 0.1,
+    method: Literal["raster", "vector", "distance"] = "raster",
 ) -> Figure:
     """
     Draw the "Stage 3" version of the knot ready to be interleaved.
@@ -170,6 +178,9 @@ def generate_stage3(
     center_alpha : float, default: 0.1
         The alpha of the center line if it is drawn.
 
+    method : {"raster", "vector", "distance"}, default: "raster"
+        How to compute the outline, see `knots.path.as_outline`.
+
     Returns
     -------
     `matplotlib.figure.Figure`
@@ -185,7 +196,13 @@ def generate_stage3(
 
     ax.axis("off")
     ax.set_aspect("equal")
-    arts = make_stage3(knot, width, center_alpha=center_alpha)
+    arts = make_stage3(
+        knot,
+        width,
+        center_alpha=center_alpha,
+        method=method,
+        fig_width=fig_size[0],
+    )
     for art in arts:
         ax.add_artist(art)
 
@@ -200,7 +217,9 @@ def make_stage3(
     width: float = 7,
     *,
     center_alpha: float = 0.1,
-) -> Figure:
+    method: Literal["raster", "vector", "distance"] = "raster",
+    fig_width: float = 5,
+) -> Stage3Artists:
     """
     Draw the "Stage 3" version of the knot ready to be interleaved.
 
@@ -227,14 +246,136 @@ def make_stage3(
     center_alpha : float, default: 0.1
         The alpha of the center line if it is drawn.
 
+    method : {"raster", "vector", "distance"}, default: "raster"
+        How to compute the outline, see `knots.path.as_outline`.
+
+    fig_width : float, default: 5
+        The width in inches of the figure the artists will be drawn in.
+
     Returns
     -------
-    `matplotlib.figure.Figure`
+    Stage3Artists
 
     """
     return Stage3Artists(
         make_artist(
-            as_outline(knot, width=width),
+            as_outline(knot, width=width, method=method, fig_width=fig_width),
+            lw=1,
+            color="k",
+        ),
+        make_artist(
+            knot.path,
+            lw=1,
+            ls="--",
+            color="k",
+            alpha=center_alpha,
+        ),
+    )
+
+
+@_auto_display
+def generate_stage4(
+    knot: Knot,
+    width: float = 7,
+    *,
+    gap: float = 2,
+    center_line: bool = False,
+    fig_size: tuple[float, float] | None = None,
+    center_alpha: float = 0.1,
+) -> Figure:
+    """
+    Draw the "Stage 4" version of the knot with the crossings interleaved.
+
+    Parameters
+    ----------
+    knot : Knot
+        The knot to render
+
+    width : float, default: 7
+        The width in points of the ribbon of the knot.
+
+    gap : float, default: 2
+        The space in points left between the edges of the strand going over
+        and the one going under at each crossing.
+
+    center_line : bool, default: False
+        If the center line of the knot should also be drawn.
+
+    fig_size : tuple, default: None
+        The size of the rendered figure in in, following `matplotlib.figure.Figure`.
+
+        If not given, get the aspect ratio from the `Knot` make the width 5in
+
+    center_alpha : float, default: 0.1
+        The alpha of the center line if it is drawn.
+
+    Returns
+    -------
+    `matplotlib.figure.Figure`
+
+    """
+    if fig_size is None:
+        aspect_ratio = float(np.diff(knot.ylimits)[0] / np.diff(knot.xlimits)[0])
+        fig_size = (5, 5 * aspect_ratio)
+    fig = Figure(figsize=fig_size)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_xlim(*knot.xlimits)
+    ax.set_ylim(*knot.ylimits)
+
+    ax.axis("off")
+    ax.set_aspect("equal")
+    arts = make_stage4(
+        knot, width, gap=gap, center_alpha=center_alpha, fig_width=fig_size[0]
+    )
+    for art in arts:
+        ax.add_artist(art)
+
+    if not center_line:
+        arts.center_line.set_visible(False)
+
+    return fig
+
+
+def make_stage4(
+    knot: Knot,
+    width: float = 7,
+    *,
+    gap: float = 2,
+    center_alpha: float = 0.1,
+    fig_width: float = 5,
+) -> Stage4Artists:
+    """
+    Make the artists for the "Stage 4" version of the knot.
+
+    The crossings alternate over and under along the ribbon, see
+    `knots.path.as_interlaced`.
+
+    Parameters
+    ----------
+    knot : Knot
+        The knot to render
+
+    width : float, default: 7
+        The width in points of the ribbon of the knot.
+
+    gap : float, default: 2
+        The space in points left between the edges of the strand going over
+        and the one going under at each crossing.
+
+    center_alpha : float, default: 0.1
+        The alpha of the center line.
+
+    fig_width : float, default: 5
+        The width in inches of the figure the artists will be drawn in.
+
+    Returns
+    -------
+    Stage4Artists
+
+    """
+    return Stage4Artists(
+        make_artist(
+            as_interlaced(knot, width=width, gap=gap, fig_width=fig_width),
             lw=1,
             color="k",
         ),
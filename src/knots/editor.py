@@ -1,14 +1,67 @@
-from collections.abc import Sequence
+import dataclasses
+import time
+from collections import namedtuple
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
 from pprint import pprint
 
 import numpy as np
 from matplotlib.axes import Axes
 from matplotlib.backend_bases import MouseButton
 from matplotlib.figure import Figure
+from matplotlib.path import Path
+from matplotlib.transforms import Transform
 from matplotlib.widgets import RangeSlider, Slider
+from scipy.spatial import cKDTree
 
 from knots.display import generate_stage3, make_guide, make_stage3
-from knots.path import Knot, Pt, as_outline, guess_bounds, path_from_pts
+from knots.path import (
+    ArcLengthIndex,
+    Knot,
+    Pt,
+    Symmetry,
+    as_outline,
+    four_fold,
+    guess_bounds,
+    path_from_pts,
+    update_four_fold,
+    update_path_from_arrays,
+)
+
+
+def _copy_path(path: Path) -> Path:
+    return Path(
+        np.array(path.vertices, dtype=float),
+        None if path.codes is None else np.array(path.codes),
+    )
+
+
+class _HitIndex:
+    """
+    Display space KD-trees of the control points and of the curve.
+
+    The curve is sampled at (about) *spacing* pixels along its arc length.
+    """
+
+    def __init__(self, xy, path: Path, trans: Transform, spacing: float):
+        self.key = _transform_key(trans)
+        self.points = cKDTree(trans.transform(xy))
+        arc = ArcLengthIndex(path)
+        # the largest stretch of the data -> display transform
+        scale = np.linalg.norm(trans.get_affine().get_matrix()[:2, :2], 2)
+        n = int(np.clip(arc.length * scale / spacing, 2, 1_000_000))
+        s = np.linspace(0, arc.length, n)
+        self.seg, self.t = arc.parameter(s)
+        self.curve = cKDTree(trans.transform(arc.position(s)))
+
+
+FrameStats = namedtuple("FrameStats", "fps latency")
+FrameStats.__doc__ = """namedtuple of the smoothed editor frame rate and the latency
+(in s) from the first coalesced motion event to the end of its redraw."""
+
+
+def _transform_key(trans: Transform) -> bytes:
+    return trans.get_affine().get_matrix().tobytes()
 
 
 class ReleaseSlider(Slider):
@@ -67,11 +120,33 @@ class ReleaseSlider(Slider):
 
 
 class KnotArtistManager:
-    def __init__(self, knot: Knot, *, width=7):
+    # how often (in ms) to check for a finished stage 3 outline
+    poll_interval = 20
+    # how long (in s) a preview outline may take
+    preview_budget = 1 / 30
+
+    def __init__(self, knot: Knot, *, width=7, method="raster", debounce=0.05):
         self.guide_artists = make_guide(knot, width)
-        self.stage3_artists = make_stage3(knot, width)
+        self.stage3_artists = make_stage3(knot, width, method=method)
         self.knot = knot
         self.width = width
+        self.method = method
+        # seconds to wait for another request before starting an outline
+        self.debounce = debounce
+        # resolution of the preview outline, adapted to `preview_budget`
+        self.preview_dpi = 100.0
+
+        # stage 3 is computed off of the GUI thread, only the latest request
+        # (by generation) is ever drawn
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="knots-stage3"
+        )
+        self._generation = 0
+        self._pending: Future | None = None
+        self._timer = None
+        # called to redraw after a new outline is swapped in, defaults to
+        # draw_idle of the whole figure
+        self.on_stage3: Callable[[], None] | None = None
 
     def update(self, knot: Knot | None = None):
         if knot is not None:
@@ -89,11 +164,92 @@ class KnotArtistManager:
         self.guide_artists.bezier.set_data(np.asarray(base_path.vertices).T)
 
     def update_satge3(self):
-        self.stage3_artists.outline.set_path(
-            as_outline(self.knot, width=self.width),
+        """
+        Recompute the stage 3 outline in the background.
+
+        Requests that arrive within *debounce* of each other are coalesced and
+        any request that has been superseded is cancelled (or its result
+        discarded if it already started).  The outline is swapped in from a
+        timer on the GUI thread, or by `wait_stage3`.
+        """
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = self._executor.submit(
+            self._compute_stage3, self._generation, self.knot, self.width, self.method
+        )
+        canvas = self.stage3_artists.outline.figure.canvas
+        if self._timer is None:
+            self._timer = canvas.new_timer(interval=self.poll_interval)
+            self._timer.add_callback(self._poll_stage3)
+        self._timer.start()
+
+    def _compute_stage3(
+        self, generation: int, knot: Knot, width: float, method
+    ) -> tuple[int, Knot, Path] | None:
+        time.sleep(self.debounce)
+        if generation != self._generation:
+            return None
+        return generation, knot, as_outline(knot, width=width, method=method)
+
+    def _poll_stage3(self):
+        pending = self._pending
+        if pending is None:
+            self._timer.stop()
+            return
+        if not pending.done():
+            return
+        self._apply_stage3(pending)
+        self._timer.stop()
+
+    def _apply_stage3(self, pending: Future):
+        if pending is self._pending:
+            self._pending = None
+        if pending.cancelled():
+            return
+        result = pending.result()
+        if result is None or result[0] != self._generation:
+            return
+        _, knot, outline = result
+        self.stage3_artists.outline.set_path(outline)
+        self.stage3_artists.center_line.set_path(knot.path)
+        if self.on_stage3 is not None:
+            self.on_stage3()
+        else:
+            self.stage3_artists.outline.figure.canvas.draw_idle()
+
+    def preview_stage3(self):
+        """
+        Immediately update stage 3 with a low resolution outline.
+
+        The resolution is adapted so that each preview takes about half of
+        *preview_budget*.  Any pending full quality outline is superseded, call
+        `update_satge3` to replace the preview.
+        """
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+        start = time.perf_counter()
+        outline = as_outline(
+            self.knot, width=self.width, method="raster", dpi=self.preview_dpi
         )
+        elapsed = time.perf_counter() - start
+        self.stage3_artists.outline.set_path(outline)
         self.stage3_artists.center_line.set_path(self.knot.path)
-        self.stage3_artists.outline.figure.canvas.draw_idle()
+        # the cost scales with the number of pixels, round so that the pooled
+        # renderers can be reused
+        step = np.clip(np.sqrt(self.preview_budget / 2 / max(elapsed, 1e-6)), 0.5, 1.5)
+        self.preview_dpi = float(
+            np.clip(np.round(self.preview_dpi * step, -1), 20, 300)
+        )
+
+    def wait_stage3(self, timeout: float | None = None):
+        """Block until the latest stage 3 outline is computed and swap it in."""
+        pending = self._pending
+        if pending is None:
+            return
+        pending.result(timeout)
+        self._apply_stage3(pending)
 
     def add_guide(self, ax: Axes, animated=False):
         ax.set_xlim(*self.knot.xlimits)
@@ -116,17 +272,26 @@ class KnotArtistManager:
         for art in self.guide_artists:
             art.axes.draw_artist(art)
 
+    def draw_stage3(self):
+        for art in self.stage3_artists:
+            if art.get_animated():
+                art.axes.draw_artist(art)
+
 
 class KnotInteractor:
     """
     A path editor.
 
     Press 't' to toggle vertex markers on and off.  When vertex markers are on,
-    they can be dragged with the mouse.
+    they can be dragged with the mouse.  Press 'F' to toggle the frame rate
+    readout.
     """
 
     showverts = True
     epsilon = 5  # max pixel distance to count as a vertex hit
+    progressive = True  # show a low resolution stage 3 while editing
+    frame_interval = 1 / 60  # min time (in s) between redraws while dragging
+    show_fps = False  # press 'F' to toggle the frame rate readout
 
     def __init__(
         self,
@@ -153,10 +318,33 @@ class KnotInteractor:
         self.kam = KnotArtistManager(self.generate_knot(), width=width)
 
         self.kam.add_guide(self.ax_path, animated=True)
+        # only animated while editing, see `_animate_stage3`
         self.kam.add_stage3(self.ax_stage3)
 
         self._ind = None  # the active vertex
         self._slider_ind = 0  # the active vertex
+        # if the knot path has been patched in place since the last full update
+        self._patched = False
+        # rebuilt lazily after edits or if the view changes
+        self._hit_index: _HitIndex | None = None
+
+        # motion events are coalesced to one redraw per frame
+        self._backgrounds: dict[Axes, object] = {}
+        self._pending_xy: tuple[float, float] | None = None
+        self._pending_since = 0.0
+        self._last_frame = 0.0
+        self._frame_timer = None
+        self._fps = 0.0
+        self._latency = 0.0
+        self._fps_text = self.ax_path.text(
+            0.02,
+            0.98,
+            "",
+            transform=self.ax_path.transAxes,
+            va="top",
+            animated=True,
+        )
+        self.kam.on_stage3 = self._blit_stage3
 
         self.widgets = {}
         self.widgets["w"] = Slider(c_axes["w"], "width", 1, 25, valinit=width)
@@ -182,11 +370,11 @@ class KnotInteractor:
         self.widgets["a"].on_changed(self._angle_change)
 
         # delayed updates
-        self.widgets["i"].on_release(self.kam.update_satge3)
-        self.widgets["s"].on_release(self.kam.update_satge3)
-        self.widgets["a"].on_release(self.kam.update_satge3)
+        self.widgets["i"].on_release(self._commit)
+        self.widgets["s"].on_release(self._commit)
+        self.widgets["a"].on_release(self._commit)
 
-        self.widgets["w"].on_changed(lambda val: setattr(self.kam, "width", val))
+        self.widgets["w"].on_changed(self._width_change)
 
         self._index_change(self._slider_ind)
 
@@ -212,15 +400,71 @@ class KnotInteractor:
             for k in ["a", "s"]:
                 self.widgets[k].eventson = True
 
+    def _width_change(self, val):
+        # the distance field of the knot is cached so this is only a contour
+        self.kam.width = val
+        self.kam.update_satge3()
+
     def _scale_change(self, val):
         vert = self.points[self._slider_ind]
         self.points[self._slider_ind] = (*vert[:2], val)
-        self.kam.update(knot=self.generate_knot())
+        self._update_point(self._slider_ind)
 
     def _angle_change(self, val):
         vert = self.points[self._slider_ind]
         self.points[self._slider_ind] = (vert[0], val, vert[-1])
-        self.kam.update(knot=self.generate_knot())
+        self._update_point(self._slider_ind)
+
+    def _update_point(self, ind: int):
+        """
+        Patch the knot in place after point *ind* has changed.
+
+        Only the segments into and out of the point (and their copies) are
+        recomputed.  The bounds are left alone until `_commit`.
+        """
+        self._hit_index = None
+        self._animate_stage3(True)
+        knot = self.knot
+        if not self._patched:
+            # the knot may be in use by a stage 3 job, patch a copy
+            knot = dataclasses.replace(
+                knot,
+                path=_copy_path(knot.path),
+                base_path=None
+                if knot.base_path is None
+                else _copy_path(knot.base_path),
+            )
+            self.kam.knot = knot
+        xy = np.array([p[0] for p in self.points], dtype=float)
+        angles = np.array([p[1] for p in self.points], dtype=float)
+        scales = np.array([p[2] for p in self.points], dtype=float)
+        changed = None
+        if self.reflect_func is None:
+            changed = update_path_from_arrays(
+                knot.path, xy, angles, scales, [ind], closed=True
+            )
+        elif self.reflect_func is four_fold and knot.base_path is not None:
+            cell = update_path_from_arrays(knot.base_path, xy, angles, scales, [ind])
+            changed = update_four_fold(knot.path, knot.base_path, cell)
+        if changed is None:
+            self._patched = False
+            self.kam.update(knot=self.generate_knot())
+            if self.progressive:
+                self.kam.preview_stage3()
+            return
+        knot.invalidate()
+        self._patched = True
+        self.kam.update()
+        if self.progressive:
+            self.kam.preview_stage3()
+
+    def _commit(self):
+        """Regenerate the knot (and its bounds) if needed and update stage 3."""
+        if self._patched:
+            self._patched = False
+            self.kam.update(knot=self.generate_knot())
+        self._animate_stage3(False)
+        self.kam.update_satge3()
 
     @property
     def knot(self) -> Knot:
@@ -234,26 +478,131 @@ class KnotInteractor:
             base_path = path_from_pts(self.points, self.scale)
             path = self.reflect_func(base_path)
         bounds = guess_bounds(path, 1.1)
-        return Knot(path, base_path, xlimits=bounds.xlimits, ylimits=bounds.ylimits)
+        return Knot(
+            path,
+            base_path,
+            xlimits=bounds.xlimits,
+            ylimits=bounds.ylimits,
+            symmetry=Symmetry(2, True) if self.reflect_func is four_fold else None,
+        )
+
+    def _get_hit_index(self) -> _HitIndex:
+        trans = self.kam.guide_artists.bezier.get_transform()
+        hit = self._hit_index
+        if hit is None or hit.key != _transform_key(trans):
+            knot = self.knot
+            hit = self._hit_index = _HitIndex(
+                np.asarray([_[0] for _ in self.points]),
+                knot.path if knot.base_path is None else knot.base_path,
+                trans,
+                self.epsilon / 2,
+            )
+        return hit
 
     def get_ind_under_point(self, event):
         """
         Return the index of the point closest to the event position or *None*
         if no point is within ``self.epsilon`` to the event position.
         """
-        xy = np.asarray([_[0] for _ in self.points])
-        xyt = self.kam.guide_artists.bezier.get_transform().transform(
-            xy
-        )  # to display coords
-        xt, yt = xyt.T
-        d = np.sqrt((xt - event.x) ** 2 + (yt - event.y) ** 2)
-        ind = d.argmin()
-        return ind if d[ind] < self.epsilon else None
+        d, ind = self._get_hit_index().points.query((event.x, event.y))
+        return int(ind) if d < self.epsilon else None
+
+    def get_segment_under_point(self, event) -> tuple[int, float] | None:
+        """
+        Return the segment (and Bezier parameter) of the curve closest to the
+        event position or *None* if the curve is not within ``self.epsilon``
+        of the event position.
+
+        Segment *i* runs from point *i* to point *i + 1*.
+        """
+        hit = self._get_hit_index()
+        d, j = hit.curve.query((event.x, event.y))
+        if d >= self.epsilon:
+            return None
+        return int(hit.seg[j]), float(hit.t[j])
 
     def on_draw(self, event):  # noqa: ARG002
         """Callback for draws."""
-        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._backgrounds = {
+            ax: self.canvas.copy_from_bbox(ax.bbox)
+            for ax in (self.ax_path, self.ax_stage3)
+        }
         self.kam.draw_guide()
+        self.kam.draw_stage3()
+        if self.show_fps:
+            self.ax_path.draw_artist(self._fps_text)
+
+    def _blit_guide(self):
+        if self.ax_path not in self._backgrounds:
+            return
+        self.canvas.restore_region(self._backgrounds[self.ax_path])
+        self.kam.draw_guide()
+        if self.show_fps:
+            self._fps_text.set_text(
+                f"{self._fps:.0f} fps, {1000 * self._latency:.0f} ms"
+            )
+            self.ax_path.draw_artist(self._fps_text)
+        self.canvas.blit(self.ax_path.bbox)
+
+    def _animate_stage3(self, animated: bool):
+        """
+        Switch stage 3 between blitting (while editing) and normal drawing.
+
+        Animated artists are skipped by ``savefig`` so stage 3 is only
+        animated for the duration of an edit.
+        """
+        if self.kam.stage3_artists.outline.get_animated() == animated:
+            return
+        for art in self.kam.stage3_artists:
+            art.set_animated(animated)
+        if animated:
+            # capture backgrounds without the outline that is being replaced
+            self.canvas.draw()
+        else:
+            self.canvas.draw_idle()
+
+    def _blit_stage3(self):
+        if (
+            not self.kam.stage3_artists.outline.get_animated()
+            or self.ax_stage3 not in self._backgrounds
+        ):
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._backgrounds[self.ax_stage3])
+        self.kam.draw_stage3()
+        self.canvas.blit(self.ax_stage3.bbox)
+
+    @property
+    def frame_stats(self) -> FrameStats:
+        """The smoothed frame rate and latency while dragging."""
+        return FrameStats(self._fps, self._latency)
+
+    def _render_frame(self):
+        """Apply the latest coalesced motion event and blit both axes."""
+        if self._pending_xy is None or self._ind is None:
+            return
+        x, y = self._pending_xy
+        self._pending_xy = None
+        self.points[self._ind] = (Pt(x, y), *self.points[self._ind][1:])
+        self._update_point(self._ind)
+        self._blit_guide()
+        self._blit_stage3()
+
+        # exponentially smoothed frame rate and latency
+        now = time.perf_counter()
+        alpha = 0.2
+        if self._last_frame:
+            rate = 1 / max(now - self._last_frame, 1e-6)
+            self._fps = (
+                rate if not self._fps else (1 - alpha) * self._fps + alpha * rate
+            )
+        latency = now - self._pending_since
+        self._latency = (
+            latency
+            if not self._latency
+            else (1 - alpha) * self._latency + alpha * latency
+        )
+        self._last_frame = now
 
     def on_button_press(self, event):
         """Callback for mouse button presses."""
@@ -266,18 +615,31 @@ class KnotInteractor:
         self._ind = ind = self.get_ind_under_point(event)
         if ind is not None:
             self.widgets["i"].set_val(self._ind)
+            return
+        # select (but do not drag) the nearer end of a clicked segment
+        hit = self.get_segment_under_point(event)
+        if hit is not None:
+            seg, t = hit
+            self.widgets["i"].set_val((seg + round(t)) % len(self.points))
 
     def on_button_release(self, event):
         """Callback for mouse button releases."""
         if event.button != MouseButton.LEFT or not self.showverts:
             return
-        self.kam.update_satge3()
+        # do not drop the last motion event of a drag
+        self._render_frame()
+        self._commit()
         self._ind = None
+        self._last_frame = 0.0
 
     def on_key_press(self, event):
         """Callback for key presses."""
 
-        if event.key == "R":
+        # 'f' is Matplotlib's full screen key
+        if event.key == "F":
+            self.show_fps = not self.show_fps
+            self._blit_guide()
+        elif event.key == "R":
             generate_stage3(self.knot, self.kam.width, center_line=True)
         elif event.key == "P":
             pprint(
@@ -301,13 +663,19 @@ class KnotInteractor:
         ):
             return
 
-        self.points[self._ind] = (
-            Pt(event.xdata, event.ydata),
-            *self.points[self._ind][1:],
-        )
-
-        self.kam.update(knot=self.generate_knot())
+        if self._pending_xy is None:
+            self._pending_since = time.perf_counter()
+        self._pending_xy = (event.xdata, event.ydata)
 
-        self.canvas.restore_region(self.background)
-        self.kam.draw_guide()
-        self.canvas.blit(self.canvas.figure.bbox)
+        wait = self.frame_interval - (time.perf_counter() - self._last_frame)
+        if wait <= 0:
+            self._render_frame()
+            return
+        # redraw once the frame is up, with whatever event is latest by then
+        if self._frame_timer is None:
+            self._frame_timer = self.canvas.new_timer()
+            self._frame_timer.single_shot = True
+            self._frame_timer.add_callback(self._render_frame)
+        self._frame_timer.stop()
+        self._frame_timer.interval = max(int(1000 * wait), 1)
+        self._frame_timer.start()
@@ -1,16 +1,22 @@
-from collections import namedtuple
-from collections.abc import Generator, Sequence
+import contextlib
+import itertools
+import threading
+from collections import OrderedDict, namedtuple
+from collections.abc import Callable, Generator, Sequence
 from dataclasses import dataclass, field
-from typing import cast
+from typing import Any, Literal, cast
 
 import numpy as np
 import numpy.typing as npt
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import RendererAgg
 from matplotlib.patches import PathPatch
 from matplotlib.path import Path
+from matplotlib.transforms import Affine2D
+from scipy.ndimage import distance_transform_edt
+from scipy.spatial import cKDTree
 
-from knots.spline import SplineCurve
+from knots.cache import OutlineCache, content_key
+from knots.spline import SplineCurve, fit_splines
 from knots.transforms import KnotTransform
 
 from contourpy import LineType, contour_generator
@@ -20,6 +26,38 @@ Pt.__doc__ = "namedtuple for (x, y) coordinates."
 
 Bounds = namedtuple("Bounds", "xlimits ylimits")
 
+DistanceField = namedtuple("DistanceField", "x y distance")
+DistanceField.__doc__ = "namedtuple for a sampled distance from a knot's center line."
+
+Crossings = namedtuple("Crossings", "xy a b")
+Crossings.__doc__ = """namedtuple for the self-intersections of a path.
+
+*xy* is an (M, 2) array of the crossing points and *a* and *b* are (M,)
+arrays of the path parameter of the first and second pass through each
+crossing (with ``a < b``).  The path parameter of segment *i* (counting the
+non-degenerate segments of the path) runs from *i* to *i + 1*.
+"""
+
+Topology = namedtuple("Topology", "gauss_code strands crossings alternating")
+Topology.__doc__ = """namedtuple for the combinatorial structure of a knot diagram.
+
+*gauss_code* has one tuple per strand listing the crossings (numbered from 1
+in the order of `Crossings`) in the order they are passed, positive when
+going over and negative when going under.  *strands* is the number of
+strands, *crossings* the number of crossings in the diagram, and
+*alternating* is True if strictly alternating over and under along every
+strand (choosing which strands start with over) is consistent at every
+crossing.
+"""
+
+Symmetry = namedtuple("Symmetry", "n mirror")
+Symmetry.__doc__ = """namedtuple for the symmetry of a knot about the origin.
+
+*n* is the order of the rotational symmetry and if *mirror* is True the knot
+is also symmetric under reflection across the x-axis (and hence across all of
+the lines at multiples of pi / n).
+"""
+
 
 def make_artist(path: Path, *, color, **kwargs):
     return PathPatch(path, facecolor="none", edgecolor=color, **kwargs)
@@ -49,6 +87,12 @@ class Knot:
     xlimits: tuple[float, float] = field(repr=False, default=(-1.1, 1.1))
     # the ylimits to use when rendering
     ylimits: tuple[float, float] = field(repr=False, default=(-1.1, 1.1))
+    # if known, the symmetry of the path about the origin
+    symmetry: Symmetry | None = field(repr=False, default=None)
+    # derived products (most recently used last), see `_cached`
+    _cache: OrderedDict = field(
+        repr=False, init=False, compare=False, default_factory=OrderedDict
+    )
 
     @classmethod
     def four_fold(cls, base_path: Path, **kwargs):
@@ -61,20 +105,110 @@ class Knot:
         return cls(
             path,
             base_path,
-            **{"xlimits": bounds.xlimits, "ylimits": bounds.ylimits, **kwargs},
+            **{
+                "xlimits": bounds.xlimits,
+                "ylimits": bounds.ylimits,
+                "symmetry": Symmetry(2, True),
+                **kwargs,
+            },
+        )
+
+    @classmethod
+    def n_fold(cls, base_path: Path, n: int, *, mirror: bool = True, **kwargs):
+        """
+        Generate a n-fold (dihedral if *mirror*) symmetric `Knot` from a
+        `~matplotlib.path.Path`, see `n_fold`.
+        """
+        path = n_fold(base_path, n, mirror=mirror)
+        bounds = guess_bounds(path)
+
+        return cls(
+            path,
+            base_path,
+            **{
+                "xlimits": bounds.xlimits,
+                "ylimits": bounds.ylimits,
+                "symmetry": Symmetry(n, mirror),
+                **kwargs,
+            },
         )
 
     @classmethod
     def as_spline(cls, points, pix_err=0.2, **kwargs):
-        sc = SplineCurve.from_pts(points, pix_err=pix_err, need_sort=False)
-        verts = sc.q_phi_to_xy(0, np.linspace(0, 2 * np.pi, 1024)).T
-        path = Path(verts, closed=True)
+        """
+        Fit a closed spline to *points* and store it as an exact cubic Bezier
+        path with one segment per knot interval of the spline.
+
+        Any other keyword arguments are passed to the `Knot`.
+        """
+        return cls.from_spline(
+            SplineCurve.from_pts(points, pix_err=pix_err, need_sort=False), **kwargs
+        )
+
+    @classmethod
+    def as_splines(
+        cls,
+        point_sets,
+        pix_err=0.2,
+        *,
+        max_workers: int | None = None,
+        chunksize: int | None = None,
+    ) -> list["Knot"]:
+        """
+        `Knot.as_spline` for many sets of points, fit in a process pool.
+
+        See `knots.spline.fit_splines` for *max_workers* and *chunksize*.  The
+        knots are in the same order as *point_sets*.
+        """
+        curves = fit_splines(
+            point_sets,
+            max_workers=max_workers,
+            chunksize=chunksize,
+            pix_err=pix_err,
+            need_sort=False,
+        )
+        return [cls.from_spline(sc) for sc in curves]
+
+    @classmethod
+    def from_spline(cls, sc: SplineCurve, **kwargs):
+        """
+        Generate a `Knot` from a (closed, cubic) `SplineCurve` as an exact
+        Bezier path, see `SplineCurve.bezier_segments`.
+        """
+        segments = sc.bezier_segments()
+        verts = np.concatenate(
+            [segments[:1, 0], segments[:, 1:].reshape(-1, 2), segments[:1, 0]]
+        )
+        codes = np.full(len(verts), Path.CURVE4, dtype=Path.code_type)
+        codes[0] = Path.MOVETO
+        codes[-1] = Path.CLOSEPOLY
+        path = Path(verts, codes)
         bounds = guess_bounds(path)
         return cls(
             path,
-            **{"xlimits": bounds.xlimits, "ylimits": bounds.ylimits},
+            **{"xlimits": bounds.xlimits, "ylimits": bounds.ylimits, **kwargs},
         )
 
+    @property
+    def bounds(self) -> Bounds:
+        """The (cached) `guess_bounds` of the path."""
+        return _cached(self, ("bounds",), lambda: guess_bounds(self.path))
+
+    @property
+    def arc_length(self) -> "ArcLengthIndex":
+        """The (cached) `ArcLengthIndex` of the path."""
+        return _cached(self, ("arc_length",), lambda: ArcLengthIndex(self.path))
+
+    def invalidate(self):
+        """
+        Drop the cached products of the knot.
+
+        Call this after modifying the vertices of the path in place (see
+        `update_path_from_arrays`).
+        """
+        with _CACHE_LOCK:
+            self._cache.clear()
+
     @classmethod
     def from_path(cls, path: Path, **kwargs):
         bounds = guess_bounds(path)
@@ -91,6 +225,10 @@ def join(*paths: Path, close: bool = False) -> Path:
     that any internal MOVETO are converted to LINETO and there is option to
     close the result.
 
+    The output arrays are allocated once from the lengths of the inputs and
+    filled in a single pass, so joining many paths does not copy the data
+    more than once.
+
     Parameters
     ----------
     paths : Path
@@ -103,17 +241,32 @@ def join(*paths: Path, close: bool = False) -> Path:
     -------
     Path
     """
-    pout = Path.make_compound_path(*paths)
-    running_total = 0
-    for p in paths[:-1]:
-        running_total += len(p.codes)
-        assert pout.codes[running_total] == Path.MOVETO
-        pout.codes[running_total] = Path.LINETO
+    sizes = [np.shape(p.vertices)[0] for p in paths]
+    total = sum(sizes)
+    if total == 0:
+        return Path(np.empty((0, 2)))
+    verts = np.empty((total + close, 2))
+    codes = np.empty(total + close, dtype=Path.code_type)
+    i = 0
+    for p, size in zip(paths, sizes, strict=True):
+        verts[i : i + size] = p.vertices
+        if p.codes is None:
+            codes[i : i + size] = Path.LINETO
+        else:
+            codes[i : i + size] = p.codes
+            assert size == 0 or codes[i] == Path.MOVETO
+        # the MOVETO at the start of each path become LINETO
+        codes[i] = Path.LINETO
+        i += size
+    codes[0] = Path.MOVETO
     if close:
-        verts = np.concatenate([pout.vertices, pout.vertices[:1]])
-        codes = np.concatenate([pout.codes, [Path.CLOSEPOLY]])
-        pout = Path(verts, codes)
-    return pout
+        verts[-1] = verts[0]
+        codes[-1] = Path.CLOSEPOLY
+    # as in make_compound_path, internal STOPs are a bug
+    not_stop = codes != Path.STOP
+    if not not_stop.all():
+        verts, codes = verts[not_stop], codes[not_stop]
+    return Path(verts, codes)
 
 
 def reverse(path: Path) -> Path:
@@ -142,20 +295,280 @@ def four_fold(path: Path) -> Path:
     look smooth, have the path leave the yaxis horizonatally and approach the
     xaxis vertically.
 
+    Unlike `n_fold`, the mirror lines are always the axes, wherever the unit
+    cell starts and ends.
+
+    Parameters
+    ----------
+    path : Path
+        The unit cell
+
+    Returns
+    -------
+    Path
+
+    """
+    mats, flip = _four_fold_copies()
+    return _assemble_copies(path, mats, flip, snap=False)
+
+
+def _reflection(theta: float) -> npt.NDArray[np.float64]:
+    """The matrix of a reflection across the line at *theta* through the origin."""
+    c, s = np.cos(2 * theta), np.sin(2 * theta)
+    return np.array([[c, s], [s, -c]])
+
+
+def _rotation(theta: float) -> npt.NDArray[np.float64]:
+    """The matrix of a rotation by *theta* about the origin."""
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([[c, -s], [s, c]])
+
+
+def _dihedral_copies(
+    theta_start: float, theta_end: float, n: int
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+    """
+    The matrices of the ``2 * n`` copies of a cell between two mirror lines.
+
+    Each copy is the previous one reflected across the line it ends on, which
+    for a copy ``M`` of the cell is ``M @ R @ M^-1`` with ``R`` the reflection
+    across the line (at *theta_end*, or *theta_start* if the copy is
+    reversed) that the cell itself ends on.
+    """
+    mirrors = (_reflection(theta_end), _reflection(theta_start))
+    mats = [np.eye(2)]
+    for k in range(2 * n - 1):
+        mats.append(mats[-1] @ mirrors[k % 2])
+    return np.asarray(mats), np.arange(2 * n) % 2 == 1
+
+
+def _four_fold_copies() -> tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+    """The copies of `four_fold`, mirrored across the fixed axes."""
+    return _dihedral_copies(np.pi / 2, 0, 2)
+
+
+def _n_fold_copies(
+    start: npt.NDArray[np.float64], end: npt.NDArray[np.float64], n: int, mirror: bool
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+    """
+    The matrices mapping a unit cell onto each of its copies in `n_fold`.
+
+    The copies only depend on the first and last vertex of the unit cell.
+
+    Returns
+    -------
+    mats : NDArray[float]
+        (K, 2, 2) array of the linear map of each copy
+
+    flips : NDArray[bool]
+        Which copies are reversed
+
+    Raises
+    ------
+    ValueError
+        If the ends of the cell are not on adjacent mirror lines (or, if not
+        *mirror*, one is not the other rotated by ``2 pi / n``).
+    """
+    tol = 1e-9 * max(np.hypot(*start), np.hypot(*end), 1)
+    if mirror:
+        step = np.pi / n
+        thetas = []
+        for pt in (start, end):
+            theta = np.round(np.arctan2(pt[1], pt[0]) / step) * step
+            # distance from the line at theta
+            if abs(pt[1] * np.cos(theta) - pt[0] * np.sin(theta)) > tol:
+                msg = (
+                    f"The unit cell must start and end on the mirror lines at "
+                    f"multiples of pi / {n}, not at ({pt[0]:g}, {pt[1]:g})"
+                )
+                raise ValueError(msg)
+            thetas.append(theta)
+        gap = (thetas[1] - thetas[0]) % np.pi
+        if not (np.isclose(gap, step % np.pi) or np.isclose(gap, np.pi - step)):
+            msg = "The unit cell must start and end on adjacent mirror lines"
+            raise ValueError(msg)
+        return _dihedral_copies(thetas[0], thetas[1], n)
+    sign = 1 if start[0] * end[1] - start[1] * end[0] >= 0 else -1
+    mats = np.asarray([_rotation(sign * 2 * np.pi * k / n) for k in range(n)])
+    if np.hypot(*(mats[1 % n] @ start - end)) > tol:
+        msg = f"The unit cell must end where it starts rotated by 2 pi / {n}"
+        raise ValueError(msg)
+    return mats, np.zeros(n, dtype=bool)
+
+
+def _assemble_copies(
+    path: Path,
+    mats: npt.NDArray[np.float64],
+    flip: npt.NDArray[np.bool_],
+    snap: bool,
+) -> Path:
+    """
+    Join the copies of a unit cell into one closed path.
+
+    All of the copies are computed with one stacked matrix product and the
+    codes are assembled once rather than joining the paths pair-wise.  If
+    *snap*, the start of each copy is set to the end of the previous one so
+    the copies meet exactly rather than through a segment of round-off
+    length (which Agg strokes as a miter spike).
+    """
+    verts = np.asarray(path.vertices, dtype=float)
+    if path.codes is None:
+        codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+        codes[0] = Path.MOVETO
+    else:
+        codes = np.asarray(path.codes)
+
+    # (copies, vertices, 2)
+    copies = np.einsum("kij,nj->kni", mats, verts)
+    copies[flip] = copies[flip, ::-1]
+    if snap:
+        copies[1:, 0] = copies[:-1, -1]
+        copies[-1, -1] = copies[0, 0]
+    # internal MOVETO become LINETO as in `join`
+    fwd = codes.copy()
+    fwd[0] = Path.LINETO
+    rev = np.concatenate([[Path.LINETO], codes[1:][::-1]])
+    all_codes = np.where(flip[:, None], rev, fwd).ravel()
+    all_codes[0] = Path.MOVETO
+
+    out_verts = np.concatenate([copies.reshape(-1, 2), copies[0, :1]])
+    out_codes = np.concatenate([all_codes, [Path.CLOSEPOLY]]).astype(Path.code_type)
+    return Path(out_verts, out_codes)
+
+
+def _update_copies(
+    path: Path,
+    verts: npt.NDArray[np.float64],
+    mats: npt.NDArray[np.float64],
+    flip: npt.NDArray[np.bool_],
+    idx: npt.NDArray[np.intp],
+) -> npt.NDArray[np.intp]:
+    """Recompute the copies of the vertices *idx* of a cell, see `update_n_fold`."""
+    size = len(verts)
+    out = (
+        np.where(flip[:, None], size - 1 - idx, idx)
+        + size * np.arange(len(mats))[:, None]
+    ).ravel()
+    target = cast(npt.NDArray[np.float64], path.vertices)
+    target[out] = np.einsum("kij,nj->kni", mats, verts[idx]).reshape(-1, 2)
+    if len(idx) and idx[0] == 0:
+        # the closing vertex
+        target[-1] = target[0]
+        out = np.append(out, len(target) - 1)
+    return out
+
+
+def update_four_fold(
+    path: Path, cell: Path, index: npt.ArrayLike
+) -> npt.NDArray[np.intp]:
+    """
+    Update, in place, the copies of some vertices of a unit cell.
+
+    *path* must have been made by ``four_fold(cell)`` and *cell* has since
+    been modified in place at the vertices *index*.  Only the copies of those
+    vertices are recomputed.  The mirror lines are fixed, so the ends of the
+    cell may change as well.
+
+    Parameters
+    ----------
+    path : Path
+        The pattern to update
+
+    cell : Path
+        The (modified) unit cell
+
+    index : array of int
+        The vertices of *cell* that have changed
+
+    Returns
+    -------
+    NDArray[int]
+        The indices of the vertices of *path* that changed.
+    """
+    verts = np.asarray(cell.vertices, dtype=float)
+    idx = np.unique(np.asarray(index, dtype=np.intp))
+    mats, flip = _four_fold_copies()
+    return _update_copies(path, verts, mats, flip, idx)
+
+
+def update_n_fold(
+    path: Path, cell: Path, n: int, index: npt.ArrayLike, *, mirror: bool = True
+) -> npt.NDArray[np.intp] | None:
+    """
+    Update, in place, the copies of some vertices of a unit cell.
+
+    *path* must have been made by ``n_fold(cell, n, mirror=mirror)`` and
+    *cell* has since been modified in place at the vertices *index*.  Only
+    the copies of those vertices are recomputed.
+
+    Parameters
+    ----------
+    path : Path
+        The pattern to update
+
+    cell : Path
+        The (modified) unit cell
+
+    n : int
+        The order of the rotational symmetry
+
+    index : array of int
+        The vertices of *cell* that have changed
+
+    mirror : bool, default: True
+        If the pattern has mirror symmetry.
+
+    Returns
+    -------
+    NDArray[int] or None
+        The indices of the vertices of *path* that changed, or None if the
+        first or last vertex of the cell changed (which may move the mirror
+        lines) and *path* must be regenerated with `n_fold`.
+    """
+    verts = np.asarray(cell.vertices, dtype=float)
+    idx = np.unique(np.asarray(index, dtype=np.intp))
+    if len(idx) and (idx[0] == 0 or idx[-1] == len(verts) - 1):
+        return None
+    mats, flip = _n_fold_copies(verts[0], verts[-1], n, mirror)
+    return _update_copies(path, verts, mats, flip, idx)
+
+
+def n_fold(path: Path, n: int, *, mirror: bool = True) -> Path:
+    """
+    Generate a pattern with n-fold rotational (and mirror) symmetry from a Path.
+
+    If *mirror*, the unit cell must start and end on adjacent mirror lines,
+    which are at multiples of ``pi / n`` from the x-axis.  The cell is
+    repeatedly reflected (and reversed) across the line it ends on, giving
+    ``2 * n`` copies.
+
+    If not *mirror*, the unit cell must end where it starts rotated by
+    ``± 2 pi / n`` and is rotated ``n`` times.
+
     Parameters
     ----------
     path : Path
         The unit cell
 
+    n : int
+        The order of the rotational symmetry
+
+    mirror : bool, default: True
+        If the pattern should also have mirror symmetry.
+
     Returns
     -------
     Path
 
+    Raises
+    ------
+    ValueError
+        If the ends of the unit cell are not on the mirror lines (or do not
+        match up under the rotation).
     """
-    trans = KnotTransform().reflect(0)
-    p1 = join(path, reverse(trans.transform_path(path)))
-    trans2 = KnotTransform().reflect(np.pi / 2)
-    return join(p1, reverse(trans2.transform_path(p1)), close=True)
+    verts = np.asarray(path.vertices, dtype=float)
+    mats, flip = _n_fold_copies(verts[0], verts[-1], n, mirror)
+    return _assemble_copies(path, mats, flip, snap=True)
 
 
 def gen_curve3(
@@ -280,18 +693,22 @@ def gen_curve4(
 
 
 def path_from_pts(
-    points: Sequence[tuple[Pt, float]], scale: float = 0.3, closed: bool = False
+    points: Sequence[tuple[Pt, float] | tuple[Pt, float, float]],
+    scale: float = 0.3,
+    closed: bool = False,
 ) -> Path:
     """
     Convert a sequence of points and entrance angles to a `~matplotlib.path.Path`
 
-    This will generate a compound cubic Bezier curve to represent the path via
-    `gen_curve4`.
+    This will generate a compound cubic Bezier curve to represent the path with
+    the same construction as `gen_curve4`, but computed in one pass via
+    `path_from_arrays`.
 
     Parameters
     ----------
-    points : sequence of (Pt, float)
-        The location and entrance angle of the point
+    points : sequence of (Pt, float) or (Pt, float, float)
+        The location and entrance angle of the point and optionally the scale
+        to use from this point on.
     scale : float, default: 0.3
         This controls how "loopy" the path is.  Smaller numbers
         stay closer to the direct line between the points and have
@@ -309,21 +726,155 @@ def path_from_pts(
 
 
     """
-    itr = iter(points)
-    start_point, start_angle, *rest = next(itr)
-    if len(rest):
-        (scale,) = rest
-    path_data = [(Path.MOVETO, start_point)]
-    gen = gen_curve4(path_data[-1][1], start_angle, scale=scale)
-    # mypy is complaining about the initial send being None
-    gen.send(None)  # type: ignore[arg-type]
-    for pt in itr:
-        path_data.extend(gen.send(pt))
+    xy = np.array([p[0] for p in points], dtype=float).reshape(-1, 2)
+    angles = np.array([p[1] for p in points], dtype=float)
+    scales = np.array([p[2] if len(p) == 3 else np.nan for p in points], dtype=float)
+    # a scale, once given, is used until the next one is given
+    if np.isnan(scales[0]):
+        scales[0] = scale
+    given = np.where(np.isnan(scales), 0, np.arange(len(scales)))
+    scales = scales[np.maximum.accumulate(given)]
+
+    return path_from_arrays(xy, angles, scales, closed=closed)
+
+
+def _curve4_handles(
+    start: npt.NDArray[np.float64],
+    end: npt.NDArray[np.float64],
+    exit_angle: npt.NDArray[np.float64],
+    entrance_angle: npt.NDArray[np.float64],
+    scale: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """The two inner control points of cubic segments, angles in radians."""
+    dist = np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+    reach = dist * scale
+    exit_dir = np.column_stack([np.cos(exit_angle), np.sin(exit_angle)])
+    entrance_dir = np.column_stack([np.cos(entrance_angle), np.sin(entrance_angle)])
+    return start + reach[:, None] * exit_dir, end - reach[:, None] * entrance_dir
+
+
+def path_from_arrays(
+    points: npt.ArrayLike,
+    angles: npt.ArrayLike,
+    scales: npt.ArrayLike = 0.3,
+    closed: bool = False,
+) -> Path:
+    """
+    Generate a compound cubic Bezier `~matplotlib.path.Path` from arrays.
+
+    This is the vectorized version of `path_from_pts`, all of the control
+    points are computed in one pass.  The segment ending at point *i* leaves
+    the previous point at ``angles[i - 1]``, approaches point *i* at
+    ``angles[i]`` and uses ``scales[i]`` (see `gen_curve4`).  If closed, the
+    final segment back to the first point uses the last scale.
+
+    Parameters
+    ----------
+    points : (N, 2) array
+        The location of the points
+
+    angles : (N,) array
+        The entrance angle at each point in degrees relative to the horizontal
+        axis.
+
+    scales : float or (N,) array, default: 0.3
+        How "loopy" the segment ending at each point is.
+
+    closed : bool, default: False
+        If the path should be closed or not.
 
+    Returns
+    -------
+    `matplotlib.path.Path`
+    """
+    xy = np.asarray(points, dtype=float).reshape(-1, 2)
+    theta = np.deg2rad(np.asarray(angles, dtype=float))
+    scale = np.broadcast_to(np.asarray(scales, dtype=float), theta.shape)
     if closed:
-        path_data.extend(gen.send((start_point, start_angle)))
+        xy = np.concatenate([xy, xy[:1]])
+        theta = np.concatenate([theta, theta[:1]])
+        scale = np.concatenate([scale, scale[-1:]])
+
+    end = xy[1:]
+    n_seg = len(end)
+    verts = np.empty((1 + 3 * n_seg + closed, 2))
+    verts[0] = xy[0]
+    c1, c2 = _curve4_handles(xy[:-1], end, theta[:-1], theta[1:], scale[1:])
+    verts[1 : 3 * n_seg + 1 : 3] = c1
+    verts[2 : 3 * n_seg + 1 : 3] = c2
+    verts[3 : 3 * n_seg + 1 : 3] = end
+    codes = np.full(len(verts), Path.CURVE4, dtype=Path.code_type)
+    codes[0] = Path.MOVETO
+    if closed:
+        verts[-1] = xy[0]
+        codes[-1] = Path.CLOSEPOLY
 
-    return path_data_to_path(path_data, closed=closed)
+    return Path(verts, codes)
+
+
+def update_path_from_arrays(
+    path: Path,
+    points: npt.ArrayLike,
+    angles: npt.ArrayLike,
+    scales: npt.ArrayLike,
+    index: npt.ArrayLike,
+    closed: bool = False,
+) -> npt.NDArray[np.intp]:
+    """
+    Update, in place, the segments of a path next to some of its points.
+
+    *path* must have been made by `path_from_arrays` with the same number of
+    points and the same *closed*.  Moving, rotating or scaling point *i* only
+    changes the segments into and out of it, so only those vertices are
+    recomputed.  The caller is responsible for invalidating anything derived
+    from the path (see `Knot.invalidate`).
+
+    Parameters
+    ----------
+    path : Path
+        The path to update
+
+    points, angles, scales
+        The new values, as for `path_from_arrays`.
+
+    index : array of int
+        The points that changed
+
+    closed : bool, default: False
+        If the path is closed.
+
+    Returns
+    -------
+    NDArray[int]
+        The indices of the vertices of *path* that changed.
+    """
+    xy = np.asarray(points, dtype=float).reshape(-1, 2)
+    theta = np.deg2rad(np.asarray(angles, dtype=float))
+    scale = np.broadcast_to(np.asarray(scales, dtype=float), theta.shape)
+    n = len(xy)
+    n_seg = n if closed else n - 1
+    idx = np.asarray(index, dtype=np.intp).ravel()
+    # the segments into and out of each point
+    seg = np.concatenate([idx - 1, idx])
+    seg = np.unique(seg % n if closed else seg[(seg >= 0) & (seg < n_seg)])
+    nxt = (seg + 1) % n
+    # the closing segment uses the last scale
+    c1, c2 = _curve4_handles(
+        xy[seg], xy[nxt], theta[seg], theta[nxt], scale[np.minimum(seg + 1, n - 1)]
+    )
+    verts = cast(npt.NDArray[np.float64], path.vertices)
+    verts[3 * seg + 1] = c1
+    verts[3 * seg + 2] = c2
+    verts[3 * seg + 3] = xy[nxt]
+    # the end points are rewritten but only change if they were moved
+    changed = [3 * seg + 1, 3 * seg + 2, 3 * seg[np.isin(nxt, idx)] + 3]
+    if np.any(idx == 0):
+        verts[0] = xy[0]
+        changed.append(np.array([0]))
+        if closed:
+            verts[-1] = xy[0]
+            changed.append(np.array([len(verts) - 1]))
+    return np.unique(np.concatenate(changed))
 
 
 def path_data_to_path(
@@ -354,14 +905,1356 @@ def path_data_to_path(
     return Path(verts, codes)
 
 
+# Bernstein basis for cubic Bezier curves and their first derivative
+_BEZIER4 = np.array(
+    [[1, 0, 0, 0], [-3, 3, 0, 0], [3, -6, 3, 0], [-1, 3, -3, 1]], dtype=float
+)
+
+
+def _cubic_segments(
+    path: Path,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.intp], list[bool]]:
+    """
+    Convert a Path into a stack of cubic Bezier segments.
+
+    LINETO and CURVE3 segments are degree-elevated to cubics and zero-length
+    segments (as generated by `join` when the paths share an end point) are
+    dropped.
+
+    Parameters
+    ----------
+    path : Path
+
+    Returns
+    -------
+    segments : NDArray[float]
+        (N, 4, 2) array of the control points of each segment
+
+    subpath : NDArray[int]
+        (N,) array of which sub-path each segment belongs to
+
+    closed : list[bool]
+        If each sub-path is closed
+    """
+    verts = np.asarray(path.vertices, dtype=float)
+    if path.codes is None:
+        codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+        codes[0] = Path.MOVETO
+    else:
+        codes = np.asarray(path.codes)
+
+    segs = []
+    sub_ids = []
+    closed: list[bool] = []
+    start = cur = verts[0]
+    j = 0
+    while j < len(codes):
+        code = codes[j]
+        if code == Path.MOVETO:
+            start = cur = verts[j]
+            closed.append(False)
+            j += 1
+            continue
+        if code == Path.LINETO:
+            nxt = verts[j]
+            segs.append((cur, (2 * cur + nxt) / 3, (cur + 2 * nxt) / 3, nxt))
+            j += 1
+        elif code == Path.CURVE3:
+            ctrl, nxt = verts[j], verts[j + 1]
+            segs.append(
+                (cur, cur + 2 * (ctrl - cur) / 3, nxt + 2 * (ctrl - nxt) / 3, nxt)
+            )
+            j += 2
+        elif code == Path.CURVE4:
+            segs.append((cur, verts[j], verts[j + 1], verts[j + 2]))
+            j += 3
+        elif code == Path.CLOSEPOLY:
+            nxt = start
+            segs.append((cur, (2 * cur + nxt) / 3, (cur + 2 * nxt) / 3, nxt))
+            closed[-1] = True
+            j += 1
+        else:
+            # STOP
+            j += 1
+            continue
+        cur = segs[-1][-1]
+        sub_ids.append(len(closed) - 1)
+
+    if not segs:
+        return np.zeros((0, 4, 2)), np.zeros(0, dtype=np.intp), closed
+    segments = np.asarray(segs, dtype=float)
+    subpath = np.asarray(sub_ids, dtype=np.intp)
+    # the reflections used to build symmetric knots leave round-off sized
+    # segments behind
+    size = np.ptp(segments, axis=1).max(axis=1)
+    keep = size > 1e-9 * np.ptp(verts, axis=0).max()
+    return segments[keep], subpath[keep], closed
+
+
+def _eval_cubic_at(
+    segments: npt.NDArray[np.float64],
+    seg: npt.NDArray[np.intp],
+    t: npt.NDArray[np.float64],
+    der: int = 0,
+) -> npt.NDArray[np.float64]:
+    """
+    Evaluate segment ``seg[i]`` at ``t[i]`` for every *i*.
+
+    Returns
+    -------
+    NDArray[float]
+        (M, 2) positions (or derivatives)
+    """
+    if der == 0:
+        basis = np.vander(t, 4, increasing=True) @ _BEZIER4
+    else:
+        basis = (np.vander(t, 3, increasing=True) * np.arange(1, 4)) @ _BEZIER4[1:]
+    return np.einsum("mk,mkd->md", basis, segments[seg])
+
+
+def _flatten_segments(
+    segments: npt.NDArray[np.float64], tol: float, max_step: float | None = None
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+    """
+    Choose parameters to flatten each segment to within *tol*.
+
+    The number of (uniform in t) steps for each segment comes from Wang's
+    formula, which bounds the distance between the curve and its chords by
+    the second differences of the control points, so flat segments get few
+    points and tightly curved ones get many.
+
+    Parameters
+    ----------
+    segments : NDArray[float]
+        (N, 4, 2) control points
+
+    tol : float
+        The maximum distance between the curve and the polyline
+
+    max_step : float, optional
+        If given, also make sure the points are at most this far apart.
+
+    Returns
+    -------
+    seg, t : NDArray
+        The segment and parameter of every point, sorted by segment.  Both
+        ends of every segment are included.
+    """
+    dd = segments[:, :2] - 2 * segments[:, 1:3] + segments[:, 2:]
+    m = np.hypot(dd[..., 0], dd[..., 1]).max(axis=1)
+    n = np.maximum(np.ceil(np.sqrt(0.75 * m / tol)), 1)
+    if max_step is not None:
+        # the control polygon is an upper bound on the arc length
+        poly_len = np.hypot(*np.diff(segments, axis=1).T).sum(axis=0)
+        n = np.maximum(n, np.ceil(poly_len / max_step))
+    steps = n.astype(np.intp)
+    counts = steps + 1
+    seg = np.repeat(np.arange(len(segments)), counts)
+    first = np.cumsum(counts) - counts
+    t = (np.arange(counts.sum()) - first[seg]) / steps[seg]
+    return seg, t
+
+
+def _unit_tangents(
+    segments: npt.NDArray[np.float64],
+    seg: npt.NDArray[np.intp],
+    t: npt.NDArray[np.float64],
+    pts: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Unit tangents at the flattened points of `_flatten_segments`."""
+    tan = _eval_cubic_at(segments, seg, t, der=1)
+    norm = np.hypot(tan[:, 0], tan[:, 1])
+    # the derivative vanishes where a control point sits on an end point, fall
+    # back to the local chord direction
+    size = np.ptp(segments, axis=1).max(axis=1)[seg]
+    bad = norm <= 1e-9 * size
+    if bad.any():
+        chord = np.gradient(pts, axis=0)
+        tan = np.where(bad[:, None], chord, tan)
+        norm = np.hypot(tan[:, 0], tan[:, 1])
+    return tan / norm[:, None]
+
+
+def flatten(path: Path, tol: float, *, max_step: float | None = None) -> Path:
+    """
+    Convert a Path with curves into a polyline.
+
+    All of the segments are flattened at once, each with as many points as it
+    needs to be within *tol* of the curve (see `_flatten_segments`), so flat
+    regions get fewer vertices than tightly curved ones.
+
+    Parameters
+    ----------
+    path : Path
+        The path to flatten, may contain LINETO, CURVE3 and CURVE4 segments.
+
+    tol : float
+        The maximum distance in data units between the curve and the polyline.
+
+    max_step : float, optional
+        If given, the maximum distance between vertices.
+
+    Returns
+    -------
+    Path
+        A path with only MOVETO, LINETO and CLOSEPOLY codes.
+    """
+    segments, subpath, closed = _cubic_segments(path)
+    if len(segments) == 0:
+        return Path(np.zeros((0, 2)))
+    seg, t = _flatten_segments(segments, tol, max_step)
+    # each sub-path starts at the beginning of its first segment, everything
+    # else starts at the end of the previous segment
+    sub = subpath[seg]
+    starts = (t == 0) & np.r_[True, sub[1:] != sub[:-1]]
+    keep = (t > 0) | starts
+    verts = _eval_cubic_at(segments, seg[keep], t[keep])
+    codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+    codes[starts[keep]] = Path.MOVETO
+    # the last vertex of a closed sub-path is back at its start
+    ends = np.r_[np.nonzero(starts[keep])[0][1:], len(verts)] - 1
+    is_closed = np.asarray(closed)[np.unique(sub)]
+    codes[ends[is_closed]] = Path.CLOSEPOLY
+    return Path(verts, codes)
+
+
+class ArcLengthIndex:
+    """
+    A cumulative arc-length table for a Path made of Bezier segments.
+
+    The table is built once by flattening all of the segments together (see
+    `flatten`) and positions, tangents and normals at any arc length are
+    looked up with a binary search and evaluated exactly on the curve.
+
+    Arc length is accumulated across sub-paths without including the jumps
+    between them.
+
+    Parameters
+    ----------
+    path : Path
+        The path to index
+
+    tol : float, optional
+        The maximum distance between the curve and the polyline used to
+        compute the lengths.  Defaults to 1e-6 of the size of the path.
+    """
+
+    def __init__(self, path: Path, tol: float | None = None):
+        segments, _, _ = _cubic_segments(path)
+        if len(segments) == 0:
+            msg = "can not index the arc length of an empty path"
+            raise ValueError(msg)
+        if tol is None:
+            tol = 1e-6 * float(np.ptp(segments.reshape(-1, 2), axis=0).max())
+        seg, t = _flatten_segments(segments, tol)
+        # the start of each segment is the end of the one before (or a jump
+        # to a new sub-path, which does not count towards the length)
+        new_segment = np.r_[True, seg[1:] != seg[:-1]]
+        pts = _eval_cubic_at(segments, seg, t)
+        steps = np.hypot(*np.diff(pts, axis=0).T)
+        steps[new_segment[1:]] = 0
+        keep = ~new_segment
+        keep[0] = True
+        cum = np.concatenate([[0], np.cumsum(steps)])
+
+        self._segments = segments
+        # a global parameter, segment i runs from i to i + 1
+        self._u = (seg + t)[keep]
+        self._s = cum[keep]
+
+    @property
+    def length(self) -> float:
+        """The total arc length."""
+        return float(self._s[-1])
+
+    def _locate(
+        self, s: npt.ArrayLike
+    ) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        s = np.clip(np.asarray(s, dtype=float), 0, self._s[-1])
+        j = np.clip(np.searchsorted(self._s, s, side="right") - 1, 0, len(self._s) - 2)
+        ds = self._s[j + 1] - self._s[j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(ds > 0, (s - self._s[j]) / ds, 0)
+        u = self._u[j] + frac * (self._u[j + 1] - self._u[j])
+        seg = np.minimum(np.floor(u).astype(np.intp), len(self._segments) - 1)
+        return seg, u - seg
+
+    def parameter(
+        self, s: npt.ArrayLike
+    ) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.float64]]:
+        """
+        The segment and Bezier parameter at arc length(s) *s*.
+
+        *s* is clipped to ``[0, length]``.
+        """
+        seg, t = self._locate(s)
+        return seg, t
+
+    def position(self, s: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """The (x, y) position(s) at arc length(s) *s* as an (..., 2) array."""
+        seg, t = self._locate(s)
+        return _eval_cubic_at(self._segments, seg.ravel(), t.ravel()).reshape(
+            (*seg.shape, 2)
+        )
+
+    def tangent(self, s: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """The unit tangent(s) at arc length(s) *s* as an (..., 2) array."""
+        seg, t = self._locate(s)
+        shape = (*seg.shape, 2)
+        seg, t = seg.ravel(), t.ravel()
+        pts = _eval_cubic_at(self._segments, seg, t)
+        return _unit_tangents(self._segments, seg, t, pts).reshape(shape)
+
+    def normal(self, s: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """
+        The unit normal(s) at arc length(s) *s* as an (..., 2) array.
+
+        The normal is the tangent rotated 90 degrees counter-clockwise.
+        """
+        tan = self.tangent(s)
+        return np.stack([-tan[..., 1], tan[..., 0]], axis=-1)
+
+
+def _candidate_pairs(
+    lo: npt.NDArray[np.float64], hi: npt.NDArray[np.float64]
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    """
+    Find the pairs of boxes that overlap.
+
+    Every box is added to the cells of a uniform grid (about twice the size
+    of a typical box) that it touches, only boxes that share a cell are
+    compared, and the overlap of those pairs is checked exactly.
+
+    Parameters
+    ----------
+    lo, hi : NDArray[float]
+        (N, 2) lower-left and upper-right corners of the boxes
+
+    Returns
+    -------
+    a, b : NDArray[int]
+        The indices of the overlapping pairs with ``a < b``
+    """
+    n = len(lo)
+    extent = hi - lo
+    cell = 2 * float(np.median(extent.max(axis=1)))
+    if not cell > 0:
+        cell = float(np.ptp(np.concatenate([lo, hi]), axis=0).max()) or 1.0
+    origin = lo.min(axis=0)
+    i0 = ((lo - origin) // cell).astype(np.int64)
+    i1 = ((hi - origin) // cell).astype(np.int64)
+    span = i1 - i0 + 1
+    n_cells = span[:, 0] * span[:, 1]
+
+    # (box, cell) for every cell each box touches
+    box = np.repeat(np.arange(n), n_cells)
+    k = np.arange(n_cells.sum()) - np.repeat(np.cumsum(n_cells) - n_cells, n_cells)
+    cx = i0[box, 0] + k % span[box, 0]
+    cy = i0[box, 1] + k // span[box, 0]
+    cell_id = cx * (int(i1[:, 1].max()) + 1) + cy
+    order = np.argsort(cell_id, kind="stable")
+    box, cell_id, cx, cy = box[order], cell_id[order], cx[order], cy[order]
+
+    # every pair within each cell
+    starts = np.r_[0, np.nonzero(np.diff(cell_id))[0] + 1]
+    ends = np.r_[starts[1:], len(cell_id)]
+    group_end = np.repeat(ends, ends - starts)
+    counts = group_end - np.arange(len(box)) - 1
+    first = np.repeat(np.arange(len(box)), counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second += first + 1
+    a, b = box[first], box[second]
+    # boxes that share more than one cell are only reported in the lower-left
+    # one of them
+    lower_left = (cx[first] == np.maximum(i0[a, 0], i0[b, 0])) & (
+        cy[first] == np.maximum(i0[a, 1], i0[b, 1])
+    )
+    a, b = a[lower_left], b[lower_left]
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    overlap = np.all((lo[a] <= hi[b]) & (lo[b] <= hi[a]), axis=1)
+    return a[overlap], b[overlap]
+
+
+def _refine_crossings(
+    segments: npt.NDArray[np.float64],
+    ua: npt.NDArray[np.float64],
+    ub: npt.NDArray[np.float64],
+    iterations: int = 4,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Polish crossings of the polyline onto the curves with Newton's method.
+
+    Solves ``B_a(t_a) = B_b(t_b)`` for all crossings at once, keeping the
+    initial guess for any that do not converge inside of their segments.
+    """
+    n = len(segments)
+    sa = np.minimum(np.floor(ua).astype(np.intp), n - 1)
+    sb = np.minimum(np.floor(ub).astype(np.intp), n - 1)
+    ta, tb = ua - sa, ub - sb
+    for _ in range(iterations):
+        f = _eval_cubic_at(segments, sa, ta) - _eval_cubic_at(segments, sb, tb)
+        da = _eval_cubic_at(segments, sa, ta, der=1)
+        db = _eval_cubic_at(segments, sb, tb, der=1)
+        det = -da[:, 0] * db[:, 1] + da[:, 1] * db[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dta = (-db[:, 1] * f[:, 0] + db[:, 0] * f[:, 1]) / det
+            dtb = (-da[:, 1] * f[:, 0] + da[:, 0] * f[:, 1]) / det
+        ok = np.isfinite(dta) & np.isfinite(dtb)
+        ta = np.where(ok, ta - dta, ta)
+        tb = np.where(ok, tb - dtb, tb)
+    good = (ta >= 0) & (ta <= 1) & (tb >= 0) & (tb <= 1)
+    return np.where(good, sa + ta, ua), np.where(good, sb + tb, ub)
+
+
+def crossings(path: Path, tol: float | None = None) -> Crossings:
+    """
+    Find all of the self-intersections of a path.
+
+    The path is flattened (see `flatten`) and candidate pairs of edges are
+    found by binning their bounding boxes on a uniform grid (see
+    `_candidate_pairs`), so the cost scales with the number of edges rather
+    than its square.  The crossings of the candidate pairs are computed
+    exactly for the polyline and then refined onto the Bezier curves.
+
+    Parameters
+    ----------
+    path : Path
+        The path to find the crossings of.
+
+    tol : float, optional
+        The tolerance used to flatten the path.  Defaults to 1e-4 of the size
+        of the path.
+
+    Returns
+    -------
+    Crossings
+    """
+    segments, subpath, closed = _cubic_segments(path)
+    if len(segments) < 2:
+        return Crossings(np.zeros((0, 2)), np.zeros(0), np.zeros(0))
+    if tol is None:
+        tol = 1e-4 * float(np.ptp(segments.reshape(-1, 2), axis=0).max())
+    seg, t = _flatten_segments(segments, tol)
+    # drop the duplicated start of each segment, except at the start of a
+    # sub-path
+    sub = subpath[seg]
+    sub_start = np.r_[True, sub[1:] != sub[:-1]]
+    keep = (t > 0) | (sub_start & (t == 0))
+    seg, t, sub, sub_start = seg[keep], t[keep], sub[keep], sub_start[keep]
+    pts = _eval_cubic_at(segments, seg, t)
+    u = seg + t
+
+    # edge i runs from vertex i to i + 1 within a sub-path
+    (edge,) = np.nonzero(~sub_start[1:])
+    p0, p1 = pts[edge], pts[edge + 1]
+    lo, hi = np.minimum(p0, p1), np.maximum(p0, p1)
+
+    a, b = _candidate_pairs(lo, hi)
+
+    # edges that share a vertex are not crossings
+    ea, eb = edge[a], edge[b]
+    adjacent = np.abs(ea - eb) == 1
+    # including across the seam of closed sub-paths
+    first = np.r_[np.nonzero(sub_start)[0], len(pts)]
+    sub_first = first[sub[ea]]
+    sub_last = first[sub[ea] + 1] - 2
+    is_closed = np.asarray(closed)[sub[ea]]
+    seam = (
+        is_closed
+        & (sub[ea] == sub[eb])
+        & (np.minimum(ea, eb) == sub_first)
+        & (np.maximum(ea, eb) == sub_last)
+    )
+    a, b = a[~(adjacent | seam)], b[~(adjacent | seam)]
+
+    d = p1 - p0
+    da, db = d[a], d[b]
+    r = p0[b] - p0[a]
+    denom = da[:, 0] * db[:, 1] - da[:, 1] * db[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sa = (r[:, 0] * db[:, 1] - r[:, 1] * db[:, 0]) / denom
+        sb = (r[:, 0] * da[:, 1] - r[:, 1] * da[:, 0]) / denom
+    hit = (denom != 0) & (sa >= 0) & (sa < 1) & (sb >= 0) & (sb < 1)
+    a, b, sa, sb = a[hit], b[hit], sa[hit], sb[hit]
+
+    # the parameter of the path at the crossing, linear along each edge
+    ua = u[edge[a]] + sa * (u[edge[a] + 1] - u[edge[a]])
+    ub = u[edge[b]] + sb * (u[edge[b] + 1] - u[edge[b]])
+    ua, ub = _refine_crossings(segments, ua, ub)
+    ua, ub = np.minimum(ua, ub), np.maximum(ua, ub)
+    srt = np.argsort(ua)
+    ua, ub = ua[srt], ub[srt]
+    n = len(segments)
+    sa_ = np.minimum(np.floor(ua).astype(np.intp), n - 1)
+    xy = _eval_cubic_at(segments, sa_, ua - sa_)
+    return Crossings(xy, ua, ub)
+
+
+def _arc(
+    center: npt.NDArray[np.float64],
+    n0: npt.NDArray[np.float64],
+    n1: npt.NDArray[np.float64],
+    radius: float,
+    step: float,
+) -> npt.NDArray[np.float64]:
+    """Points strictly between *n0* and *n1* on a circle, taking the short way."""
+    a0 = np.arctan2(n0[1], n0[0])
+    sweep = np.arctan2(n0[0] * n1[1] - n0[1] * n1[0], n0 @ n1)
+    n = int(np.ceil(abs(sweep) / step))
+    if n < 2:
+        return np.zeros((0, 2))
+    theta = a0 + sweep * np.linspace(0, 1, n + 1)[1:-1]
+    return center + radius * np.column_stack([np.cos(theta), np.sin(theta)])
+
+
+def _offset_loops(
+    segments: npt.NDArray[np.float64],
+    subpath: npt.NDArray[np.intp],
+    closed: list[bool],
+    half_width: float,
+) -> tuple[
+    list[npt.NDArray[np.float64]],
+    list[npt.NDArray[np.float64]],
+    list[npt.NDArray[np.float64]],
+    list[npt.NDArray[np.float64]],
+]:
+    """
+    Generate the (untrimmed) offset curves of every sub-path.
+
+    Every loop is oriented so that the ribbon is on its right.  Corners
+    between segments get round joins and the ends of open sub-paths get butt
+    caps.
+
+    Returns
+    -------
+    loops : list[NDArray[float]]
+        Closed polylines of the raw offset curves
+
+    loop_u : list[NDArray[float]]
+        The path parameter (segment index + t) each vertex of the loops was
+        offset from
+
+    center : list[NDArray[float]]
+        The sampled center line of each sub-path
+
+    center_u : list[NDArray[float]]
+        The path parameter of each vertex of the center lines
+    """
+    seg, t = _flatten_segments(segments, half_width / 100, max_step=half_width)
+    flat = _eval_cubic_at(segments, seg, t)
+    tan = _unit_tangents(segments, seg, t, flat)
+    flat_normal = np.stack([-tan[:, 1], tan[:, 0]], axis=-1)
+    bounds = np.searchsorted(seg, np.arange(len(segments) + 1))
+    pts = [flat[lo:hi] for lo, hi in itertools.pairwise(bounds)]
+    normal = [flat_normal[lo:hi] for lo, hi in itertools.pairwise(bounds)]
+    params = [(seg + t)[lo:hi] for lo, hi in itertools.pairwise(bounds)]
+    arc_step = np.pi / 16
+
+    loops = []
+    loop_u = []
+    centers = []
+    center_u = []
+    for sid, is_closed in enumerate(closed):
+        (idx,) = np.nonzero(subpath == sid)
+        if len(idx) == 0:
+            continue
+        sides = []
+        for sign in (1, -1):
+            parts = []
+            part_u = []
+            for k, j in enumerate(idx):
+                parts.append(pts[j] + sign * half_width * normal[j])
+                part_u.append(params[j])
+                if k + 1 < len(idx) or is_closed:
+                    nxt = idx[(k + 1) % len(idx)]
+                    parts.append(
+                        _arc(
+                            pts[j][-1],
+                            sign * normal[j][-1],
+                            sign * normal[nxt][0],
+                            half_width,
+                            arc_step,
+                        )
+                    )
+                    part_u.append(np.full(len(parts[-1]), params[j][-1]))
+            sides.append((np.concatenate(parts), np.concatenate(part_u)))
+        (left, left_u), (right, right_u) = sides
+        if is_closed:
+            loops.extend([left, right[::-1]])
+            loop_u.extend([left_u, right_u[::-1]])
+        else:
+            # butt caps are implied by closing the loop
+            loops.append(np.concatenate([left, right[::-1]]))
+            loop_u.append(np.concatenate([left_u, right_u[::-1]]))
+        centers.append(np.concatenate([pts[j][:-1] for j in idx] + [pts[idx[-1]][-1:]]))
+        center_u.append(
+            np.concatenate([params[j][:-1] for j in idx] + [params[idx[-1]][-1:]])
+        )
+    return loops, loop_u, centers, center_u
+
+
+def _split_loops(
+    loops: list[npt.NDArray[np.float64]],
+) -> tuple[list[npt.NDArray[np.float64]], npt.NDArray[np.intp]]:
+    """
+    Split closed polylines at all of their mutual and self intersections.
+
+    Candidate segment pairs are pruned with a KD-tree of the segment mid-points
+    so the cost scales with the number of near-by segments rather than the
+    square of the total.
+
+    Returns
+    -------
+    pieces : list[NDArray[float]]
+        Open polylines which only touch each other at their end points.
+
+    origin : NDArray[int]
+        (N, 2) array of the loop each piece came from and the index of a
+        vertex of that loop in the middle of the piece.
+    """
+    starts = np.concatenate(loops)
+    ends = np.concatenate([np.roll(loop, -1, axis=0) for loop in loops])
+    loop_id = np.concatenate([np.full(len(loop), j) for j, loop in enumerate(loops)])
+    seg_idx = np.concatenate([np.arange(len(loop)) for loop in loops])
+    d = ends - starts
+    lengths = np.hypot(d[:, 0], d[:, 1])
+
+    tree = cKDTree((starts + ends) / 2)
+    pairs = tree.query_pairs(lengths.max(), output_type="ndarray")
+    a, b = pairs.T
+    # adjacent segments share an end point by construction
+    n_seg = np.array([len(loop) for loop in loops])[loop_id[a]]
+    same = loop_id[a] == loop_id[b]
+    gap = np.abs(seg_idx[a] - seg_idx[b])
+    adjacent = same & ((gap == 1) | (gap == n_seg - 1))
+    a, b = a[~adjacent], b[~adjacent]
+
+    # solve starts[a] + s d[a] = starts[b] + t d[b]
+    denom = d[a, 0] * d[b, 1] - d[a, 1] * d[b, 0]
+    r = starts[b] - starts[a]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (r[:, 0] * d[b, 1] - r[:, 1] * d[b, 0]) / denom
+        t = (r[:, 0] * d[a, 1] - r[:, 1] * d[a, 0]) / denom
+    hit = (denom != 0) & (s >= 0) & (s < 1) & (t >= 0) & (t < 1)
+    a, b, s, t = a[hit], b[hit], s[hit], t[hit]
+    xing = starts[a] + s[:, None] * d[a]
+
+    # every crossing point is shared (bit-for-bit) by the pieces meeting there
+    seg = np.concatenate([a, b])
+    param = np.concatenate([s, t])
+    point = np.concatenate([xing, xing])
+    order = np.lexsort((param, seg))
+    seg, param, point = seg[order], param[order], point[order]
+
+    offsets = np.concatenate([[0], np.cumsum([len(loop) for loop in loops])])
+    pieces = []
+    origin = []
+    for j, loop in enumerate(loops):
+        lo, hi = np.searchsorted(seg, [offsets[j], offsets[j + 1]])
+        if lo == hi:
+            pieces.append(np.concatenate([loop, loop[:1]]))
+            origin.append((j, len(loop) // 2))
+            continue
+        local = seg[lo:hi] - offsets[j]
+        # rotate so that the loop starts at its first crossing
+        ring = np.concatenate([loop, loop])
+        cuts = list(zip(local, point[lo:hi], strict=True))
+        cuts.append((local[0] + len(loop), point[lo]))
+        for (i0, p0), (i1, p1) in itertools.pairwise(cuts):
+            pieces.append(np.concatenate([[p0], ring[i0 + 1 : i1 + 1], [p1]]))
+            origin.append((j, ((i0 + i1 + 1) // 2) % len(loop)))
+    return pieces, np.array(origin, dtype=np.intp).reshape(-1, 2)
+
+
+def _polyline_neighbors(
+    lines: list[npt.NDArray[np.float64]],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    """
+    Concatenate polylines and find the previous and next vertex of each.
+
+    The first and last vertex of each line are their own previous and next.
+    """
+    verts = np.concatenate(lines)
+    first = np.concatenate([np.arange(len(line)) == 0 for line in lines])
+    last = np.concatenate([np.arange(len(line)) == len(line) - 1 for line in lines])
+    idx = np.arange(len(verts))
+    return verts, np.where(first, idx, idx - 1), np.where(last, idx, idx + 1)
+
+
+def _segment_distances(
+    query: npt.NDArray[np.float64],
+    verts: npt.NDArray[np.float64],
+    prv: npt.NDArray[np.intp],
+    nxt: npt.NDArray[np.intp],
+    nbr: npt.NDArray[np.intp],
+) -> list[tuple[npt.NDArray[np.intp], npt.NDArray[np.intp], npt.NDArray, npt.NDArray]]:
+    """
+    The closest points on the segments before and after some vertices.
+
+    For the segments after and then before the (N, k) vertices *nbr* of each
+    query point returns the indices of their start and end, the parameter of
+    the closest point along them and the distance to it, all (N, k).
+    """
+    out = []
+    for i0, i1 in ((nbr, nxt[nbr]), (prv[nbr], nbr)):
+        a = verts[i0]
+        ab = verts[i1] - a
+        denom = (ab**2).sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(denom > 0, ((query[:, None] - a) * ab).sum(axis=-1) / denom, 0)
+        t = np.clip(t, 0, 1)
+        dist = np.hypot(*(query[:, None] - a - t[..., None] * ab).transpose(2, 0, 1))
+        out.append((i0, i1, t, dist))
+    return out
+
+
+def _near_segments(
+    query: npt.NDArray[np.float64], lines: list[npt.NDArray[np.float64]], k: int
+) -> list[tuple[npt.NDArray[np.intp], npt.NDArray[np.intp], npt.NDArray, npt.NDArray]]:
+    """
+    The closest points on the segments of polylines near each query point.
+
+    Only the segments before and after the *k* nearest vertices are
+    considered, see `_segment_distances`.  The indices are into the
+    concatenated *lines*.
+    """
+    verts, prv, nxt = _polyline_neighbors(lines)
+    k = min(k, len(verts))
+    _, nbr = cKDTree(verts).query(query, k=k)
+    return _segment_distances(query, verts, prv, nxt, nbr.reshape(len(query), k))
+
+
+def _distance_to_polylines(
+    query: npt.NDArray[np.float64], lines: list[npt.NDArray[np.float64]], k: int = 16
+) -> npt.NDArray[np.float64]:
+    """
+    Distance from each query point to the nearest of a set of polylines.
+
+    This is exact as long as the polylines are sampled finer than the
+    distances of interest, see `_near_segments`.
+    """
+    best = np.full(len(query), np.inf)
+    for _, _, _, dist in _near_segments(query, lines, k):
+        best = np.minimum(best, dist.min(axis=1))
+    return best
+
+
+def _probes(pieces: list[npt.NDArray[np.float64]]) -> npt.NDArray[np.float64]:
+    """A point in the middle of each piece of a split offset curve."""
+    return np.array(
+        [p[len(p) // 2] if len(p) > 2 else (p[0] + p[1]) / 2 for p in pieces]
+    )
+
+
+def _chain_pieces(pieces: list[npt.NDArray[np.float64]], min_size: float) -> Path:
+    """
+    Join pieces that share end points into (closed where possible) runs.
+
+    Runs smaller than *min_size* are slivers left at the joints between
+    segments and are dropped.
+    """
+    by_start: dict[tuple[float, float], list[int]] = {}
+    for j, piece in enumerate(pieces):
+        by_start.setdefault(tuple(piece[0]), []).append(j)
+
+    # start from the pieces that no other piece leads into so open runs are
+    # not split in two
+    ends = {tuple(piece[-1]) for piece in pieces}
+    order = sorted(range(len(pieces)), key=lambda j: tuple(pieces[j][0]) in ends)
+    used = np.zeros(len(pieces), dtype=bool)
+    verts = []
+    codes = []
+    for j in order:
+        if used[j]:
+            continue
+        used[j] = True
+        run = [pieces[j]]
+        first = tuple(pieces[j][0])
+        while True:
+            tail = tuple(run[-1][-1])
+            if tail == first:
+                break
+            cands = [c for c in by_start.get(tail, []) if not used[c]]
+            if not cands:
+                break
+            used[cands[0]] = True
+            run.append(pieces[cands[0]][1:])
+        line = np.concatenate(run)
+        if np.ptp(line, axis=0).max() < min_size:
+            continue
+        line_codes = np.full(len(line), Path.LINETO, dtype=Path.code_type)
+        line_codes[0] = Path.MOVETO
+        if tuple(line[-1]) == first:
+            line_codes[-1] = Path.CLOSEPOLY
+        verts.append(line)
+        codes.append(line_codes)
+    if not verts:
+        return Path(np.zeros((0, 2)))
+    return Path(np.concatenate(verts), np.concatenate(codes))
+
+
+def _vector_outline(path: Path, half_width: float) -> Path:
+    """
+    Compute the outline of the ribbon around *path* from its offset curves.
+
+    The offset curves are split at every intersection and any piece that is
+    closer than *half_width* to the center line (the inside of cusps and of
+    crossings) is discarded.
+
+    Parameters
+    ----------
+    path : Path
+        The center line
+
+    half_width : float
+        Half of the ribbon width in data units
+
+    Returns
+    -------
+    Path
+    """
+    segments, subpath, closed = _cubic_segments(path)
+    if len(segments) == 0:
+        return Path(np.zeros((0, 2)))
+    loops, _, centers, _ = _offset_loops(segments, subpath, closed, half_width)
+    pieces, _ = _split_loops(loops)
+    probe = _probes(pieces)
+    dist = _distance_to_polylines(probe, centers)
+    # the sampled center line is within ~1% of the true curve
+    keep = dist > half_width * (1 - 2e-2)
+    return _chain_pieces(
+        [p for p, k in zip(pieces, keep, strict=True) if k], 1e-2 * half_width
+    )
+
+
+def _passes(
+    xing: Crossings, subpath: npt.NDArray[np.intp]
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp], npt.NDArray[np.bool_]]:
+    """
+    Order the passes through the crossings along the path.
+
+    Each crossing is passed twice, pass *i* is the first pass (at ``xing.a``)
+    through crossing *i* and pass ``i + M`` is the second.  Walking along each
+    sub-path the passes alternate between over and under.  The first sub-path
+    starts with over and the others start with whichever makes the passes
+    through the crossings between sub-paths agree, where possible.
+
+    Returns
+    -------
+    order : NDArray[int]
+        The passes in the order they are walked
+
+    sub : NDArray[int]
+        The sub-path of each pass in *order*
+
+    over : NDArray[bool]
+        Whether each pass (in *order*) goes over
+    """
+    n = len(xing.a)
+    u = np.concatenate([xing.a, xing.b])
+    order = np.argsort(u, kind="stable")
+    sub = subpath[np.minimum(np.floor(u[order]).astype(np.intp), len(subpath) - 1)]
+    first = np.r_[True, sub[1:] != sub[:-1]]
+    start = np.maximum.accumulate(np.where(first, np.arange(2 * n), 0))
+    walked = (np.arange(2 * n) - start) % 2 == 0
+
+    # flip sub-paths so that the two passes through each crossing between
+    # sub-paths disagree, a breadth first search over the sub-paths
+    pass_sub = np.empty(2 * n, dtype=np.intp)
+    pass_sub[order] = sub
+    pass_over = np.empty(2 * n, dtype=bool)
+    pass_over[order] = walked
+    links: dict[int, list[tuple[int, bool]]] = {}
+    for c in np.nonzero(pass_sub[:n] != pass_sub[n:])[0]:
+        s0, s1 = int(pass_sub[c]), int(pass_sub[c + n])
+        same = bool(pass_over[c] == pass_over[c + n])
+        links.setdefault(s0, []).append((s1, same))
+        links.setdefault(s1, []).append((s0, same))
+    flip: dict[int, bool] = {}
+    for root in sorted(links):
+        if root in flip:
+            continue
+        flip[root] = False
+        todo = [root]
+        while todo:
+            cur = todo.pop()
+            for nxt, same in links[cur]:
+                if nxt not in flip:
+                    flip[nxt] = flip[cur] ^ same
+                    todo.append(nxt)
+    flipped = np.array([flip.get(int(j), False) for j in sub], dtype=bool)
+    return order, sub, walked ^ flipped
+
+
+def _over_under(
+    xing: Crossings, subpath: npt.NDArray[np.intp]
+) -> npt.NDArray[np.bool_]:
+    """
+    Alternate over and under along each sub-path.
+
+    If the two passes through a crossing agree (see `topology`) the first
+    pass wins.
+
+    Returns
+    -------
+    NDArray[bool]
+        Whether the strand at ``xing.a`` goes over at each crossing.
+    """
+    order, _, walked = _passes(xing, subpath)
+    over = np.empty(len(order), dtype=bool)
+    over[order] = walked
+    return over[: len(xing.a)]
+
+
+def topology(path: Path, tol: float | None = None) -> Topology:
+    """
+    Extract the Gauss code, strand count and crossing number of a path.
+
+    This only needs the self-intersections of the center line (see
+    `crossings`), no rendering, so it is cheap enough to filter large batches
+    of candidate designs.  Every sub-path of *path* is counted as a strand
+    and over/under is assigned by alternating along each strand.
+
+    The crossing number is that of this diagram, not the (minimal) crossing
+    number of the knot it represents.
+
+    Parameters
+    ----------
+    path : Path
+        The center line of the knot
+
+    tol : float, optional
+        The tolerance used to flatten the path, see `crossings`.
+
+    Returns
+    -------
+    Topology
+    """
+    _, subpath, _ = _cubic_segments(path)
+    strands = len(np.unique(subpath))
+    xing = crossings(path, tol)
+    n = len(xing.a)
+    order, sub, walked = _passes(xing, subpath)
+    over = np.empty(2 * n, dtype=bool)
+    over[order] = walked
+    alternating = bool(np.all(over[:n] != over[n:]))
+    label = order % n + 1
+    signed = np.where(walked, label, -label)
+    code = tuple(tuple(int(c) for c in signed[sub == j]) for j in np.unique(subpath))
+    return Topology(code, strands, n, alternating)
+
+
+def _interlaced_outline(path: Path, half_width: float, gap: float) -> Path:
+    """
+    Compute the outline of the ribbon around *path* with over/under gaps.
+
+    This is `_vector_outline` with a different rule for which pieces of the
+    offset curves to keep.  Near each crossing the strand that goes over
+    keeps both of its edges, the edges of the strand that goes under stop
+    *gap* short of the edges of the strand on top of it.  The offset curves
+    at ``half_width + gap`` are only used to cut the under strands.
+
+    Parameters
+    ----------
+    path : Path
+        The center line
+
+    half_width : float
+        Half of the ribbon width in data units
+
+    gap : float
+        The gap between the edges of the over and under strands in data units
+
+    Returns
+    -------
+    Path
+    """
+    segments, subpath, closed = _cubic_segments(path)
+    if len(segments) == 0:
+        return Path(np.zeros((0, 2)))
+    loops, loop_u, centers, center_u = _offset_loops(
+        segments, subpath, closed, half_width
+    )
+    cut = half_width + gap
+    cutters = _offset_loops(segments, subpath, closed, cut)[0] if gap > 0 else []
+    pieces, origin = _split_loops(loops + cutters)
+    mine = origin[:, 0] < len(loops)
+    pieces = [p for p, m in zip(pieces, mine, strict=True) if m]
+    origin = origin[mine]
+    probe = _probes(pieces)
+    probe_u = np.array([loop_u[j][i] for j, i in origin])
+
+    # arc length along the center lines, restarting at each sub-path
+    verts = np.concatenate(centers)
+    vu = np.concatenate(center_u)
+    line = np.concatenate([np.full(len(c), j) for j, c in enumerate(centers)])
+    step = np.r_[0, np.hypot(*np.diff(verts, axis=0).T)]
+    step[np.r_[True, line[1:] != line[:-1]]] = 0
+    arc = np.cumsum(step)
+    line_start = np.array([u[0] for u in center_u])
+    line_arc0 = arc[np.searchsorted(line, np.arange(len(centers)))]
+    period = np.array(
+        [
+            arc[line == j][-1] - line_arc0[j] if closed[subpath[int(u[0])]] else np.inf
+            for j, u in enumerate(center_u)
+        ]
+    )
+
+    def locate(u):
+        return np.interp(u, vu, arc), np.searchsorted(line_start, u, "right") - 1
+
+    def arc_gap(s0, l0, s1, l1):
+        d = np.abs(s0 - s1)
+        d = np.minimum(d, period[l0] - d)
+        return np.where(l0 == l1, d, np.inf)
+
+    # the distance to the center line, split into the part of the strand the
+    # piece was offset from and everything else
+    window = 3 * cut
+    q_s, q_line = locate(probe_u)
+    d_own = np.full(len(probe), np.inf)
+    d_other = np.full(len(probe), np.inf)
+    s_other = np.zeros(len(probe))
+    l_other = np.zeros(len(probe), dtype=np.intp)
+    for i0, i1, t, dist in _near_segments(probe, centers, 64):
+        s_c = arc[i0] + t * (arc[i1] - arc[i0])
+        own = arc_gap(s_c, line[i0], q_s[:, None], q_line[:, None]) < window
+        d_own = np.minimum(d_own, np.where(own, dist, np.inf).min(axis=1))
+        other = np.where(own, np.inf, dist)
+        j = other.argmin(axis=1)
+        rows = np.arange(len(probe))
+        better = other[rows, j] < d_other
+        d_other = np.where(better, other[rows, j], d_other)
+        s_other = np.where(better, s_c[rows, j], s_other)
+        l_other = np.where(better, line[i0][rows, j], l_other)
+
+    tol = 1 - 2e-2
+    keep = np.minimum(d_own, d_other) > half_width * tol
+    near = d_other < cut * tol
+    xing = crossings(path)
+    if near.any() and len(xing.a):
+        over_a = _over_under(xing, subpath)
+        a_s, a_line = locate(xing.a)
+        b_s, b_line = locate(xing.b)
+        qs, ql = q_s[near, None], q_line[near, None]
+        os_, ol = s_other[near, None], l_other[near, None]
+        as_a = arc_gap(qs, ql, a_s, a_line) + arc_gap(os_, ol, b_s, b_line)
+        as_b = arc_gap(qs, ql, b_s, b_line) + arc_gap(os_, ol, a_s, a_line)
+        cost = np.minimum(as_a, as_b)
+        c = cost.argmin(axis=1)
+        rows = np.arange(len(c))
+        # pieces near another strand but not near a crossing (for example
+        # where the ribbon overlaps itself without crossing) are left alone
+        found = cost[rows, c] < 2 * window
+        is_over = np.where(as_a[rows, c] <= as_b[rows, c], over_a[c], ~over_a[c])
+        (where,) = np.nonzero(near)
+        where = where[found]
+        keep[where] = is_over[found] & (d_own[where] > half_width * tol)
+    return _chain_pieces(
+        [p for p, k in zip(pieces, keep, strict=True) if k], 1e-2 * half_width
+    )
+
+
+# the number of derived products kept per knot
+_CACHE_SIZE = 32
+# and the memory they may use
+_CACHE_BYTES = 64 * 2**20
+# guards the caches of all knots, which may be used from worker threads
+_CACHE_LOCK = threading.Lock()
+
+
+def _nbytes(obj: Any) -> int:
+    """Estimate the memory held by the arrays of a cached product."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Path):
+        return _nbytes(obj.vertices) + _nbytes(obj.codes)
+    if isinstance(obj, tuple | list):
+        return sum(_nbytes(o) for o in obj)
+    return 0
+
+
+def _cached(knot: Knot, key: tuple, compute: Callable[[], Any]) -> Any:
+    """
+    Memoize a product derived from *knot*.
+
+    *key* must include every parameter the product depends on.  The value is
+    recomputed if the path or limits of the knot have been replaced since it
+    was cached (modifying the path in place needs `Knot.invalidate`).  Only the
+    `_CACHE_SIZE` most recently used products, using at most `_CACHE_BYTES`
+    between them, are kept.
+
+    The cache may be shared between threads.  It is locked while it is looked
+    up and updated but not during *compute*, so concurrent misses on the same
+    key compute the product more than once.
+    """
+    state = (knot.path, knot.xlimits, knot.ylimits)
+    cache = knot._cache
+    with _CACHE_LOCK:
+        hit = cache.get(key)
+        if hit is not None and all(a is b for a, b in zip(hit[0], state, strict=True)):
+            cache.move_to_end(key)
+            return hit[1]
+    out = compute()
+    with _CACHE_LOCK:
+        cache[key] = (state, out)
+        cache.move_to_end(key)
+        while len(cache) > _CACHE_SIZE:
+            cache.popitem(last=False)
+        total = sum(_nbytes(v) for _, v in cache.values())
+        # always keep the product just computed
+        while total > _CACHE_BYTES and len(cache) > 1:
+            _, (_, old) = cache.popitem(last=False)
+            total -= _nbytes(old)
+    return out
+
+
+def _quadrant_cell(knot: Knot) -> Knot | None:
+    """
+    The upper-right quadrant of a knot that is mirror symmetric in both axes.
+
+    Returns None if the knot is not known to have the symmetry or the limits
+    are not centered on the origin.
+    """
+    sym = knot.symmetry
+    if sym is None or not sym.mirror or sym.n % 2:
+        return None
+    if not (
+        np.isclose(knot.xlimits[0], -knot.xlimits[1])
+        and np.isclose(knot.ylimits[0], -knot.ylimits[1])
+    ):
+        return None
+    return Knot(knot.path, xlimits=(0, knot.xlimits[1]), ylimits=(0, knot.ylimits[1]))
+
+
+def _path_runs(path: Path) -> list[npt.NDArray[np.float64]]:
+    """Split a compound path of line segments at its MOVETOs."""
+    verts = np.asarray(path.vertices)
+    codes = np.asarray(path.codes)
+    (starts,) = np.nonzero(codes == Path.MOVETO)
+    return np.split(verts, starts[1:])
+
+
+def _drop_small_runs(path: Path, size: float) -> Path:
+    """Drop the runs of a compound line path that fit in a *size* square."""
+    verts = np.asarray(path.vertices)
+    (starts,) = np.nonzero(np.asarray(path.codes) == Path.MOVETO)
+    small = [np.ptp(run, axis=0).max() < size for run in _path_runs(path)]
+    if not any(small):
+        return path
+    keep = np.repeat(np.logical_not(small), np.diff(np.r_[starts, len(verts)]))
+    return Path(verts[keep], np.asarray(path.codes)[keep])
+
+
+def _unfold_quadrant(path: Path, size: float) -> Path:
+    """
+    Mirror a compound line path in the upper-right quadrant to all four.
+
+    Lines that end on the axes are joined up with their reflections.
+    """
+    runs = _path_runs(path)
+    pieces = []
+    for trans, flips in (
+        (KnotTransform(), False),
+        (KnotTransform().reflect(0), True),
+        (KnotTransform().reflect(np.pi / 2), True),
+        (KnotTransform().reflect(0).reflect(np.pi / 2), False),
+    ):
+        for run in runs:
+            verts = trans.transform(run)
+            # snap the round-off from the reflections back onto the axes
+            verts[np.abs(verts) < 1e-9 * size] = 0
+            pieces.append(verts[::-1] if flips else verts)
+    return _chain_pieces(pieces, 0)
+
+
+def _data_per_point(knot: Knot, fig_width: float) -> float:
+    """Data units per point for a figure *fig_width* in wide spanning the xlimits."""
+    return float(np.diff(knot.xlimits)[0]) / (fig_width * 72)
+
+
+def distance_field(
+    knot: Knot, *, dpi: float = 200, fig_width: float = 5, margin: float = 20
+) -> DistanceField:
+    """
+    Sample the (unsigned) distance to the center line of the knot on a grid.
+
+    The grid matches the pixels of `as_mask` at the same *dpi* and *fig_width*
+    and the distance is in points, so the outline of a ribbon of any width is
+    the contour of the field at half of the width.
+
+    The center line is flattened to a polyline about a pixel per step, the
+    nearest vertex to every pixel is estimated with a Euclidean distance
+    transform and refined by stepping along the polyline, and the exact
+    distance to the segments on either side of it is used.  Away from the
+    points that are (nearly) equally far from two branches of the center line
+    the field is accurate to well under a pixel.
+
+    The distance is measured to the ends of open paths, so a contour of the
+    field has round caps where the raster outline has butt caps.
+
+    The result is cached on the `Knot` and re-used as long as its path and
+    limits are not replaced.
+
+    Parameters
+    ----------
+    knot : Knot
+        The knot to generate the distance field of
+
+    dpi : float, default: 200
+        The dpi of the grid
+
+    fig_width : float, default: 5
+        The width of the (notional) figure in in.
+
+    margin : float, default: 20
+        How far in points outside of the limits to include the center line
+        when computing distances.
+
+    Returns
+    -------
+    DistanceField
+        The x and y coordinates of the grid (in data units) and the distance
+        in points as a (ny, nx) array.
+    """
+    return _cached(
+        knot,
+        ("distance_field", dpi, fig_width, margin),
+        lambda: _distance_field(knot, dpi, fig_width, margin),
+    )
+
+
+def _distance_field(
+    knot: Knot, dpi: float, fig_width: float, margin: float
+) -> DistanceField:
+    aspect_ratio = float(np.diff(knot.ylimits)[0] / np.diff(knot.xlimits)[0])
+    nx = round(fig_width * dpi)
+    ny = round(fig_width * aspect_ratio * dpi)
+    x = np.linspace(*knot.xlimits, nx)
+    y = np.linspace(*knot.ylimits, ny)
+    dx = x[1] - x[0]
+    dy = y[1] - y[0]
+    scale = _data_per_point(knot, fig_width)
+
+    segments, subpath, closed = _cubic_segments(knot.path)
+    if len(segments) == 0:
+        return DistanceField(x, y, np.full((ny, nx), np.inf))
+    step = min(dx, dy)
+    seg, t = _flatten_segments(segments, step / 10, max_step=step)
+    samples = _eval_cubic_at(segments, seg, t)
+    lines = []
+    for j in np.unique(subpath):
+        line = samples[subpath[seg] == j]
+        # drop the repeated ends of the segments so every step moves
+        line = line[np.r_[True, np.any(line[1:] != line[:-1], axis=1)]]
+        lines.append(line)
+    verts, prv, nxt = _polyline_neighbors(lines)
+    size = np.array([len(line) for line in lines])
+    is_closed = np.asarray(closed)[np.unique(subpath)] & (size > 2)
+    # the first vertex and the length of the line of every vertex, closed
+    # lines repeat their start at the end and are walked around it
+    starts = np.cumsum(size) - size
+    first = np.repeat(starts, size)
+    count = np.repeat(np.where(is_closed, size - 1, size), size)
+    wrap = np.repeat(is_closed, size)
+    for lo, n in zip(starts[is_closed], size[is_closed], strict=True):
+        prv[lo] = lo + n - 2
+        nxt[lo + n - 1] = lo + 1
+
+    pad = int(np.ceil(margin / 72 * dpi))
+    col = np.rint((verts[:, 0] - x[0]) / dx).astype(int) + pad
+    row = np.rint((verts[:, 1] - y[0]) / dy).astype(int) + pad
+    inside = (col >= 0) & (col < nx + 2 * pad) & (row >= 0) & (row < ny + 2 * pad)
+    if not inside.any():
+        return DistanceField(x, y, np.full((ny, nx), np.inf))
+    seed = np.full((ny + 2 * pad, nx + 2 * pad), -1, dtype=np.intp)
+    seed[row[inside], col[inside]] = np.nonzero(inside)[0]
+    rows, cols = distance_transform_edt(
+        seed < 0, return_distances=False, return_indices=True
+    )
+    crop = (slice(pad, pad + ny), slice(pad, pad + nx))
+    # the sample in the nearest seeded pixel is within about a pixel of the
+    # nearest sample, step along its line by the projection of the offset on
+    # the tangent to get to the closest one
+    nearest = seed[rows[crop], cols[crop]].ravel()
+    query = np.empty((nx * ny, 2))
+    query.reshape(ny, nx, 2)[...] = np.stack(np.meshgrid(x, y), axis=-1)
+    # scaled so the projection of an offset is the number of steps to take
+    tangent = verts[nxt] - verts[prv]
+    here = np.arange(len(verts))
+    steps = (prv != here).astype(float) + (nxt != here)
+    tangent *= (steps / np.maximum(np.sum(tangent**2, axis=1), 1e-300))[:, None]
+    dist = np.empty(nx * ny)
+    # a chunk at a time to stay in the cache
+    for start in range(0, nx * ny, 2**14):
+        sl = slice(start, start + 2**14)
+        q = query[sl]
+        idx = nearest[sl]
+        d = np.hypot(*(q - verts[idx]).T)
+        for _ in range(2):
+            offset = np.rint(np.sum((q - verts[idx]) * tangent[idx], axis=1))
+            pos = idx - first[idx] + offset.astype(np.intp)
+            pos = np.where(wrap[idx], pos % count[idx], np.clip(pos, 0, count[idx] - 1))
+            cand = first[idx] + pos
+            d_cand = np.hypot(*(q - verts[cand]).T)
+            better = d_cand < d
+            idx = np.where(better, cand, idx)
+            d = np.where(better, d_cand, d)
+        # and then to the closest point on the segments on either side of it
+        for _, _, _, d_seg in _segment_distances(q, verts, prv, nxt, idx[:, None]):
+            d = np.minimum(d, d_seg[:, 0])
+        dist[sl] = d
+
+    return DistanceField(x, y, dist.reshape(ny, nx) / scale)
+
+
+class _RendererPool:
+    """
+    Re-usable Agg renderers keyed by their size in pixels and dpi.
+
+    Renderers are checked out for the duration of a draw so concurrent callers
+    never share a buffer.  Only the *maxsize* most recently used sizes are
+    kept.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = maxsize
+        self._free: OrderedDict[tuple[int, int, float], list[RendererAgg]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def renderer(self, width: int, height: int, dpi: float):
+        key = (width, height, dpi)
+        with self._lock:
+            free = self._free.get(key)
+            renderer = free.pop() if free else None
+        if renderer is None:
+            renderer = RendererAgg(width, height, dpi)
+        try:
+            renderer.clear()
+            yield renderer
+        finally:
+            with self._lock:
+                self._free.setdefault(key, []).append(renderer)
+                self._free.move_to_end(key)
+                while len(self._free) > self.maxsize:
+                    self._free.popitem(last=False)
+
+
+_renderer_pool = _RendererPool()
+
+
 def as_mask(
     knot: Knot, width: float, *, dpi: float = 200, fig_width: float = 5
 ) -> npt.NDArray[np.uint8]:
     """
     Generate a mask of points "in the ribbon".
 
-    This works by rendering the path via Matplotlib and extracting a gray-scale
-    image.
+    This works by stroking the path with Matplotlib's Agg renderer and
+    extracting a gray-scale image.  The renderers are pooled and re-used
+    between calls with the same size and dpi.
 
     Due to anti-aliasing this is a grayscale mask as uint8.  To get a binary mask,
     threshold at your level of choice.
@@ -378,35 +2271,90 @@ def as_mask(
         The dpi to render at internally
 
     fig_width : float, default: 5
-        The width of the transient figure used in in.
+        The width of the (notional) figure used in in.
 
 
     Returns
     -------
     mask : NDArray[np.uint8]
-        gray-scale mask of the knot
+        gray-scale mask of the knot, 0 in the ribbon and 255 outside of it.
+        The first row is at the bottom of the ylimits.  The mask is cached on
+        the knot, each call returns a new copy of it.
     """
-    aspect_ratio = float(np.diff(knot.ylimits) / np.diff(knot.xlimits))
-    fig = Figure(dpi=dpi, figsize=(fig_width, fig_width * aspect_ratio))
-    canvas = FigureCanvasAgg(fig)
-    ax = fig.add_axes((0, 0, 1, 1))
-    ax.axis("off")
-    ax.set_aspect("equal")
-    ax.set_xlim(*knot.xlimits)
-    ax.set_ylim(*knot.ylimits)
-
-    ax.add_artist(make_artist(knot.path, color="k", lw=width))
-    canvas.draw()
+    return _cached(
+        knot,
+        ("mask", width, dpi, fig_width),
+        lambda: _render_mask(knot, width, dpi, fig_width),
+    ).copy()
 
-    return np.flipud(np.asarray(canvas.buffer_rgba())[:, :, 0])
 
+def _render_mask(
+    knot: Knot, width: float, dpi: float, fig_width: float
+) -> npt.NDArray[np.uint8]:
+    aspect_ratio = float(np.diff(knot.ylimits)[0] / np.diff(knot.xlimits)[0])
+    w = fig_width * dpi
+    h = fig_width * aspect_ratio * dpi
+    # data -> pixels with the y-axis pointing down the rows of the buffer so
+    # there is no need to flip the result
+    trans = (
+        Affine2D()
+        .translate(-knot.xlimits[0], -knot.ylimits[0])
+        .scale(w / np.diff(knot.xlimits)[0], -h / np.diff(knot.ylimits)[0])
+        .translate(0, int(h))
+    )
 
-def as_outline(knot: Knot, width: float = 7, *, thresh=128) -> Path:
+    with _renderer_pool.renderer(int(w), int(h), dpi) as renderer:
+        gc = renderer.new_gc()
+        gc.set_foreground("k")
+        gc.set_linewidth(width)
+        gc.set_capstyle("butt")
+        gc.set_joinstyle("miter")
+        renderer.draw_path(gc, knot.path, trans)
+        gc.restore()
+        # draw onto a transparent buffer so the coverage is in alpha
+        mask = 255 - np.asarray(renderer.buffer_rgba())[:, :, 3]
+    mask.setflags(write=False)
+    return mask
+
+
+def as_outline(
+    knot: Knot,
+    width: float = 7,
+    *,
+    thresh=128,
+    method: Literal["raster", "vector", "distance"] = "raster",
+    fig_width: float = 5,
+    dpi: float | None = None,
+    disk_cache: OutlineCache | None = None,
+) -> Path:
     """
     Generate the (compound) path of the outline of the knot ribbon.
 
-    This works by generating the mask of the knot and then extracting a contour
-    at a given gray level.
+    There are three methods available:
+
+    ``"raster"``
+        Generate the mask of the knot at 600 dpi and then extract a contour at
+        a given gray level.
+
+    ``"vector"``
+        Offset the Bezier segments of the center line by half of the width,
+        split the offset curves where they cross, and drop the pieces that
+        fall inside of the ribbon.  This is resolution independent and much
+        faster than rendering.  Corners of the center line get round joins
+        where the raster method gives miter joins.
+
+    ``"distance"``
+        Extract the contour at half of the width from the `distance_field` of
+        the knot.  The field is cached on the knot so changing the width only
+        costs a single contour pass.  Open paths get round caps.
+
+    For knots that are known to be mirror symmetric about both axes (such as
+    those made by `Knot.four_fold`) the raster methods only render and contour
+    the upper-right quadrant and mirror the result.
+
+    The outline is cached on the knot, keyed by all of the parameters, so
+    repeated calls (for example exporting at several sizes) are free.  To
+    reuse outlines between runs or processes pass a *disk_cache*.
 
     Parameters
     ----------
@@ -417,25 +2365,153 @@ def as_outline(knot: Knot, width: float = 7, *, thresh=128) -> Path:
         The width of the ribbon in points.
 
     thresh : int, default: 128
-        The level to generate the contour at
+        The level to generate the contour at.  Only used by the raster method.
+
+    method : {"raster", "vector", "distance"}, default: "raster"
+        How to compute the outline.
+
+    fig_width : float, default: 5
+        The width in inches of the figure the knot is drawn in, used to
+        convert *width* to data units.
+
+    dpi : float, optional
+        The resolution of the raster methods.  Defaults to 600 for
+        ``"raster"`` and 200 for ``"distance"``.
+
+    disk_cache : OutlineCache, optional
+        If given, look the outline up by the content of the knot (see
+        `knots.cache.content_key`) before computing it and store it after.
 
     Returns
     -------
     `matplotlib.path.Path`
     """
-    mask = as_mask(knot, width, dpi=600)
-    ny, nx = mask.shape
+    if method not in ("raster", "vector", "distance"):
+        msg = f"method must be 'raster', 'vector', or 'distance', not {method!r}"
+        raise ValueError(msg)
+    params = ("outline", width, thresh, method, fig_width, dpi)
+
+    def compute() -> Path:
+        if disk_cache is None:
+            return _outline(knot, width, thresh, method, fig_width, dpi)
+        key = content_key(knot.path, knot.xlimits, knot.ylimits, params)
+        p = disk_cache.get(key)
+        if p is None:
+            p = _outline(knot, width, thresh, method, fig_width, dpi)
+            disk_cache.put(key, p)
+        p.should_simplify = True
+        return p
+
+    return _cached(knot, params, compute)
+
+
+def _outline(
+    knot: Knot,
+    width: float,
+    thresh,
+    method: Literal["raster", "vector", "distance"],
+    fig_width: float,
+    dpi: float | None,
+) -> Path:
+    if method == "vector":
+        scale = _data_per_point(knot, fig_width)
+        p = _vector_outline(knot.path, width * scale / 2)
+        p.should_simplify = True
+        return p
+
+    cell = _quadrant_cell(knot)
+    if cell is not None:
+        # the quadrant is half as wide as the full knot
+        fig_width /= 2
+        target = cell
+    else:
+        target = knot
+
+    if method == "distance":
+        dpi = 200 if dpi is None else dpi
+        if cell is None:
+            x, y, z = distance_field(knot, dpi=dpi, fig_width=fig_width)
+        else:
+            # cache the field of the quadrant on the knot itself so all of
+            # its products share one memory bound
+            x, y, z = _cached(
+                knot,
+                ("quadrant_distance_field", dpi, fig_width),
+                lambda: _distance_field(target, dpi, fig_width, 20),
+            )
+        level = width / 2
+    else:
+        # only the outline is cached, not the (large) mask it is traced from
+        z = _render_mask(target, width, 600 if dpi is None else dpi, fig_width)
+        ny, nx = z.shape
+        x = np.linspace(*target.xlimits, nx)
+        y = np.linspace(*target.ylimits, ny)
+        level = thresh
+
     gen = contour_generator(
-        z=mask,
-        x=np.linspace(*knot.xlimits, nx),
-        y=np.linspace(*knot.ylimits, ny),
+        z=z,
+        x=x,
+        y=y,
         line_type=LineType.ChunkCombinedCode,
     )
     # this is clearer?
     (verts,), (codes,) = cast(
         tuple[list[npt.ArrayLike], list[npt.ArrayLike]],
-        gen.lines(thresh),
+        gen.lines(level),
     )
     p = Path(verts, codes)
+    if method == "distance" and len(p):
+        # levels just below a ridge of the field (where the center line comes
+        # back close to itself) can give specks, drop the ones under a pixel
+        p = _drop_small_runs(p, max(x[1] - x[0], y[1] - y[0]))
+    if cell is not None:
+        p = _unfold_quadrant(p, float(np.ptp(knot.xlimits)))
+    p.should_simplify = True
+    return p
+
+
+def as_interlaced(
+    knot: Knot, width: float = 7, *, gap: float = 2, fig_width: float = 5
+) -> Path:
+    """
+    Generate the outline of the knot ribbon with the crossings interlaced.
+
+    The crossings of the center line (see `crossings`) alternate between
+    going over and under along each strand.  Where a strand goes under, the
+    edges of its ribbon are cut back so that they stop *gap* short of the
+    ribbon on top of it.  The result is computed from the offset curves of
+    the center line, as for the ``"vector"`` method of `as_outline`, and
+    consists of open paths.  As for `as_outline` the result is cached on the
+    knot.
+
+    Parameters
+    ----------
+    knot : Knot
+        The knot to generate the outline of
+
+    width : float, default : 7
+        The width of the ribbon in points.
+
+    gap : float, default: 2
+        The space in points between the edges of the over and under strands.
+
+    fig_width : float, default: 5
+        The width in inches of the figure the knot is drawn in, used to
+        convert *width* and *gap* to data units.
+
+    Returns
+    -------
+    `matplotlib.path.Path`
+    """
+    return _cached(
+        knot,
+        ("interlaced", width, gap, fig_width),
+        lambda: _interlaced(knot, width, gap, fig_width),
+    )
+
+
+def _interlaced(knot: Knot, width: float, gap: float, fig_width: float) -> Path:
+    scale = _data_per_point(knot, fig_width)
+    p = _interlaced_outline(knot.path, width * scale / 2, gap * scale)
     p.should_simplify = True
     return p
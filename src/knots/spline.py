@@ -1,8 +1,12 @@
 # Lightly adapted from infra.py in https://github.com/tacaswell/leidenfrost
 # that I wrote as part of my PhD thesis.
 
+import math
+import os
 from collections import namedtuple
-from functools import reduce
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import numpy as np
 import numpy.fft as fft
@@ -32,7 +36,7 @@ class SplineCurve:
         =====
 
         :param points: the points to fit the spline to
-        :type points: a 2xN ndarray or a list of len =2 tuples
+        :type points: a 2xN (or Nx2) ndarray or a list of len =2 tuples
 
         :param pix_err: the error is finding the spline in pixels
         :param need_sort: if the points need to be sorted
@@ -45,37 +49,34 @@ class SplineCurve:
            The return data from the spline fitting
         """
 
-        if type(points) is np.ndarray:
-            # make into a list
-            pt_lst = list(zip(*points, strict=True))
-            # get center
-            center = np.mean(points, axis=1).reshape(2, 1)
+        if isinstance(points, np.ndarray):
+            pts = np.asarray(points, dtype=float)
+            if pts.ndim == 2 and pts.shape[0] != 2 and pts.shape[1] == 2:
+                # (N, 2)
+                pts = pts.T
         else:
-            # make a copy of the list
-            pt_lst = list(points)
-            # compute center
-            center = np.array(
-                reduce(lambda x, y: (x[0] + y[0], x[1] + y[1]), pt_lst)
-            ).reshape(2, 1)
-            center /= len(pt_lst)
-
-        if len(pt_lst) < 5:
+            # a sequence of (x, y) pairs
+            pts = np.asarray(list(points), dtype=float).T
+        if pts.ndim != 2 or pts.shape[0] != 2:
+            msg = f"points must be (2, N) or (N, 2), not {np.shape(points)}"
+            raise ValueError(msg)
+
+        if pts.shape[1] < 5:
             raise TooFewPointsException("not enough points")
 
         if need_sort:
-            # sort the list by angle around center
-            pt_lst.sort(key=lambda x: np.arctan2(x[1] - center[1], x[0] - center[0]))
+            # sort by angle around center, stable like sorting the list was
+            center = pts.mean(axis=1, keepdims=True)
+            theta = np.arctan2(pts[1] - center[1], pts[0] - center[0])
+            pts = pts[:, np.argsort(theta, kind="stable")]
 
         # add first point to end because it is periodic (makes the
         # interpolation code happy)
-        if pt_lst[0] != pt_lst[-1]:
-            pt_lst.append(pt_lst[0])
+        if not np.array_equal(pts[:, 0], pts[:, -1]):
+            pts = np.concatenate([pts, pts[:, :1]], axis=1)
 
-        # make array for handing in to spline fitting
-        pt_array = np.vstack(pt_lst).T
         # do spline fitting
-
-        tck, u = si.splprep(pt_array, s=len(pt_lst) * (pix_err**2), per=True, k=3)
+        tck, _ = si.splprep(pts, s=pts.shape[1] * (pix_err**2), per=True, k=3)
 
         return tck
 
@@ -86,18 +87,52 @@ class SplineCurve:
         this.raw_pts = new_pts
         return this
 
+    # the number of sample resolutions to keep
+    _max_samples = 8
+
     def __init__(self, tck):
         """A really hacky way of doing different"""
         self.tck = tck
+        # the points the spline was fit to, if known
+        self.raw_pts = None
+
+    @property
+    def tck(self):
+        return self._tck
+
+    @tck.setter
+    def tck(self, tck):
+        # everything derived from the old spline is stale
+        self._tck = tck
         self._cntr = None
         self._circ = None
         self._th_offset = None
+        self._samples = {}
+
+    def samples(self, N, der=0):
+        """
+        The (cached) positions or derivatives at N evenly spaced points in
+        parameter space, as a read-only (2, N) array.
+
+        The cache is shared by the metrics of the curve and is cleared when
+        `tck` is replaced.
+        """
+        key = (N, der)
+        out = self._samples.get(key)
+        if out is None:
+            out = np.asarray(si.splev(np.linspace(0, 1, N), self.tck, der=der, ext=2))
+            out.setflags(write=False)
+            if len(self._samples) >= self._max_samples:
+                # drop the oldest
+                self._samples.pop(next(iter(self._samples)))
+            self._samples[key] = out
+        return out
 
     @property
     def circ(self):
         """returns a rough estimate of the circumference"""
         if self._circ is None:
-            new_pts = si.splev(np.linspace(0, 1, 1000), self.tck, ext=2)
+            new_pts = self.samples(1000)
             self._circ = np.sum(np.sqrt(np.sum(np.diff(new_pts, axis=1) ** 2, axis=0)))
         return self._circ
 
@@ -105,7 +140,7 @@ class SplineCurve:
     def cntr(self):
         """returns a rough estimate of the circumference"""
         if self._cntr is None:
-            new_pts = si.splev(np.linspace(0, 1, 1000), self.tck, ext=2)
+            new_pts = self.samples(1000)
             self._cntr = np.mean(new_pts, 1)
         return self._cntr
 
@@ -135,7 +170,10 @@ class SplineCurve:
         """Converts q, phi pairs -> x, y pairs.  All other code that
         does this should move to using this so that there is minimal
         breakage when we change over to using additive q instead of
-        multiplicative"""
+        multiplicative
+
+        If *cross*, every q is paired with every phi and the result is a
+        (2, len(q), len(phi)) array."""
         # make sure data is arrays
         q = np.asarray(q)
         # convert real units -> interpolation units
@@ -169,20 +207,13 @@ class SplineCurve:
         norm = np.sqrt(dx**2 + dy**2)
         nx, ny = dy / norm, -dx / norm
 
-        # if cross, then
+        # if cross, then broadcast every q against every phi, giving
+        # (2, len(q), *phi.shape)
         if cross:
-            data_out = list(
-                zip(
-                    *[
-                        (
-                            (x + q_ * nx).reshape(phi_shape),
-                            (y + q_ * ny).reshape(phi_shape),
-                        )
-                        for q_ in q
-                    ],
-                    strict=False,
-                )
-            )
+            q_col = q.reshape(-1, 1)
+            data_out = np.stack([x + q_col * nx, y + q_col * ny])
+            if phi_shape is not None:
+                data_out = data_out.reshape(2, len(q), *phi_shape)
         else:
             data_out = np.vstack(
                 [(x + q * nx).reshape(phi_shape), (y + q * ny).reshape(phi_shape)]
@@ -190,11 +221,40 @@ class SplineCurve:
 
         return data_out
 
+    def bezier_segments(self):
+        """
+        Convert the spline into an exactly equivalent sequence of cubic
+        Bezier segments, one per (non-empty) knot interval of ``[0, 1]``.
+
+        Returns
+        -------
+        ret : ndarray
+            (N, 4, 2) array of the control points of each segment, the end of
+            each segment is the start of the next.
+        """
+        t, c, k = self.tck
+        if k != 3:
+            raise ValueError("only cubic splines can be converted to Bezier")
+        # piecewise polynomials in the local power basis
+        # c[0] (x - a)**3 + c[1] (x - a)**2 + c[2] (x - a) + c[3]
+        pp = [si.PPoly.from_spline((t, c_, k)) for c_ in c]
+        a, b = pp[0].x[:-1], pp[0].x[1:]
+        keep = (b > a) & (a >= t[k]) & (b <= t[-k - 1])
+        h = (b - a)[keep]
+        # (4, N, 2), rescaled to s = (x - a) / h in [0, 1]
+        coef = np.stack([p.c[:, keep] for p in pp], axis=-1)
+        cube, sq, lin, const = (coef[j] * (h ** (3 - j))[:, None] for j in range(4))
+        p0 = const
+        p1 = const + lin / 3
+        p2 = const + 2 * lin / 3 + sq / 3
+        p3 = const + lin + sq + cube
+        return np.stack([p0, p1, p2, p3], axis=1)
+
     def fft_filter(self, mode):
         if mode == 0:
             return
         sample_pow = 12
-        tmp_pts = si.splev(np.linspace(0, 1, 2**sample_pow), self.tck)
+        tmp_pts = self.samples(2**sample_pow)
 
         mask = np.zeros(2**sample_pow)
         mask[0] = 1
@@ -235,7 +295,11 @@ class SplineCurve:
             [mode_param(n=n, x=abs_angle(x_amp, x_phase),
                         y=abs_angle(y_amp, y_phase)), ...]
         """
-        curve_data = self.q_phi_to_xy(1, np.linspace(0, 2 * np.pi, 1000))
+        # q_phi_to_xy(1, linspace(0, 2 pi, 1000)) from the shared samples, the
+        # curve is periodic so phi = 2 pi is the same point as phi = 0
+        (x, y), (dx, dy) = self.samples(1000), self.samples(1000, der=1)
+        norm = np.sqrt(dx**2 + dy**2)
+        curve_data = np.vstack([x + dy / norm, y - dx / norm])
         curve_fft = [np.fft.fft(_d) / len(_d) for _d in curve_data]
         return [
             self.mode_param(
@@ -268,15 +332,7 @@ class SplineCurve:
             (
                 [0],
                 np.cumsum(
-                    np.sqrt(
-                        np.sum(
-                            np.diff(
-                                si.splev(np.linspace(0, 1, N), self.tck, ext=2), axis=1
-                            )
-                            ** 2,
-                            axis=0,
-                        )
-                    )
+                    np.sqrt(np.sum(np.diff(self.samples(N), axis=1) ** 2, axis=0))
                 ),
             )
         )
@@ -300,7 +356,7 @@ class SplineCurve:
         intep_func = si.interp1d
         cntr = self.cntr.reshape(2, 1)
         # over sample in spline space
-        XY = si.splev(np.linspace(0, 1, 2 * N), self.tck, ext=2) - cntr
+        XY = self.samples(2 * N) - cntr
         theta = np.mod(np.arctan2(XY[1], XY[0]), 2 * np.pi)
         indx = np.argsort(theta)
         XY = XY[:, indx]
@@ -315,3 +371,58 @@ class SplineCurve:
         return np.concatenate(
             ([0], np.cumsum(np.sqrt(np.sum(np.diff(XY_resample, axis=1) ** 2, axis=0))))
         )
+
+
+def _fit_tck(points, **kwargs):
+    # module level so it can be pickled to the workers
+    return SplineCurve._get_spline(points, **kwargs)
+
+
+def fit_splines(
+    point_sets: Iterable,
+    *,
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+    **kwargs,
+) -> list[SplineCurve]:
+    """
+    Fit closed splines to many sets of points in a process pool.
+
+    Parameters
+    ----------
+    point_sets : iterable
+        The point sets, each as accepted by `SplineCurve.from_pts`
+
+    max_workers : int, optional
+        The number of processes, defaults to the number of CPUs.  If 1 the
+        fits are done serially in this process.
+
+    chunksize : int, optional
+        How many point sets to send to a worker at once.  Defaults to
+        splitting the work into about 4 chunks per worker.
+
+    **kwargs
+        Passed to `SplineCurve.from_pts`
+
+    Returns
+    -------
+    list[SplineCurve]
+        In the same order as *point_sets*
+    """
+    point_sets = list(point_sets)
+    fit = partial(_fit_tck, **kwargs)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1 or len(point_sets) < 2:
+        tcks = list(map(fit, point_sets))
+    else:
+        if chunksize is None:
+            chunksize = max(1, math.ceil(len(point_sets) / (4 * max_workers)))
+        with ProcessPoolExecutor(max_workers) as pool:
+            tcks = list(pool.map(fit, point_sets, chunksize=chunksize))
+    out = []
+    for pts, tck in zip(point_sets, tcks, strict=True):
+        sc = SplineCurve(tck)
+        sc.raw_pts = pts
+        out.append(sc)
+    return out
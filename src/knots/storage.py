@@ -0,0 +1,189 @@
+import json
+import os
+import pathlib
+import uuid
+from collections.abc import Iterable, Sequence
+from typing import overload
+
+import numpy as np
+import numpy.typing as npt
+from matplotlib.path import Path
+
+from knots.path import Knot, Symmetry
+
+_FORMAT = "knots-catalog"
+_VERSION = 2
+
+
+def save_catalog(knots: Iterable[Knot], directory: str | os.PathLike):
+    """
+    Write knots to a directory of typed arrays plus a JSON manifest.
+
+    The vertices of every path (and base path) are concatenated into one
+    ``vertices-<id>.npy`` (float64, (N, 2)) and the codes into one
+    ``codes-<id>.npy`` (uint8, (N,)), with a fresh *id* for every save.
+    ``manifest.json`` records the names of those files, the slice of each path
+    and the limits, description and symmetry of each knot.
+
+    The arrays of a save are never overwritten, so a `Catalog` that is already
+    open keeps reading consistent data.  The manifest is written last and
+    atomically renamed into place, which makes a new save visible in one step.
+    Arrays from saves before the previous one are removed.
+
+    Parameters
+    ----------
+    knots : iterable of Knot
+        The knots to save
+
+    directory : str or PathLike
+        Where to write the catalog, created if needed.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    verts: list[npt.NDArray[np.float64]] = []
+    codes: list[npt.NDArray[np.uint8]] = []
+    offset = 0
+
+    def add(path: Path) -> list:
+        nonlocal offset
+        v = np.asarray(path.vertices, dtype=np.float64).reshape(-1, 2)
+        verts.append(v)
+        has_codes = path.codes is not None
+        codes.append(
+            np.asarray(path.codes, dtype=np.uint8)
+            if has_codes
+            else np.zeros(len(v), dtype=np.uint8)
+        )
+        entry = [offset, offset + len(v), has_codes]
+        offset += len(v)
+        return entry
+
+    entries = []
+    for knot in knots:
+        entries.append(
+            {
+                "description": knot.description,
+                "xlimits": [float(x) for x in knot.xlimits],
+                "ylimits": [float(y) for y in knot.ylimits],
+                "symmetry": None
+                if knot.symmetry is None
+                else [int(knot.symmetry.n), bool(knot.symmetry.mirror)],
+                "path": add(knot.path),
+                "base_path": None if knot.base_path is None else add(knot.base_path),
+            }
+        )
+
+    token = uuid.uuid4().hex
+    files = {"vertices": f"vertices-{token}.npy", "codes": f"codes-{token}.npy"}
+    np.save(
+        directory / files["vertices"],
+        np.concatenate(verts) if verts else np.zeros((0, 2)),
+    )
+    np.save(
+        directory / files["codes"],
+        np.concatenate(codes) if codes else np.zeros(0, dtype=np.uint8),
+    )
+    # keep the arrays of the save being replaced so that a reader that has
+    # just parsed the old manifest can still open them
+    keep = set(files.values()) | set(_manifest_files(directory).values())
+    manifest = {
+        "format": _FORMAT,
+        "version": _VERSION,
+        "files": files,
+        "knots": entries,
+    }
+    tmp = directory / f"manifest-{token}.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    tmp.replace(directory / "manifest.json")
+
+    for fname in [*directory.glob("vertices-*.npy"), *directory.glob("codes-*.npy")]:
+        if fname.name not in keep:
+            try:
+                # open memory maps keep the data until they are closed
+                fname.unlink()
+            except OSError:
+                pass
+
+
+def _manifest_files(directory: pathlib.Path) -> dict[str, str]:
+    try:
+        with open(directory / "manifest.json") as f:
+            return dict(json.load(f).get("files", {}))
+    except (OSError, ValueError):
+        return {}
+
+
+class Catalog(Sequence[Knot]):
+    """
+    A read-only, lazily loaded collection of knots written by `save_catalog`.
+
+    The vertex and code arrays are memory mapped, so opening a catalog only
+    parses the manifest.  Each `Knot` is built when it is accessed and its
+    paths are (read-only) views into the mapped arrays; nothing is read from
+    disk until the vertices are used.
+
+    Parameters
+    ----------
+    directory : str or PathLike
+        A directory written by `save_catalog`
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        directory = pathlib.Path(directory)
+        with open(directory / "manifest.json") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != _FORMAT or manifest.get("version") != _VERSION:
+            msg = f"{directory} is not a version {_VERSION} knots catalog"
+            raise ValueError(msg)
+        self._entries = manifest["knots"]
+        files = manifest["files"]
+        self._vertices = np.load(directory / files["vertices"], mmap_mode="r")
+        self._codes = np.load(directory / files["codes"], mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @overload
+    def __getitem__(self, index: int) -> Knot: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Knot]: ...
+
+    def __getitem__(self, index: int | slice) -> Knot | list[Knot]:
+        if isinstance(index, slice):
+            return [self[j] for j in range(*index.indices(len(self)))]
+        entry = self._entries[index]
+        sym = entry["symmetry"]
+        return Knot(
+            self._path(entry["path"]),
+            None if entry["base_path"] is None else self._path(entry["base_path"]),
+            description=entry["description"],
+            xlimits=tuple(entry["xlimits"]),
+            ylimits=tuple(entry["ylimits"]),
+            symmetry=None if sym is None else Symmetry(*sym),
+        )
+
+    def _path(self, entry: list) -> Path:
+        start, stop, has_codes = entry
+        return Path(
+            self._vertices[start:stop],
+            self._codes[start:stop] if has_codes else None,
+            readonly=True,
+        )
+
+
+def load_catalog(directory: str | os.PathLike) -> Catalog:
+    """
+    Open a catalog of knots written by `save_catalog`.
+
+    Parameters
+    ----------
+    directory : str or PathLike
+        The directory of the catalog
+
+    Returns
+    -------
+    Catalog
+    """
+    return Catalog(directory)
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+from matplotlib.path import Path
+from numpy.testing import assert_array_equal
+
+import knots.demos as demos
+import knots.path
+from knots.cache import OutlineCache, content_key
+from knots.path import Knot, as_outline
+
+
+def _key(path, xlimits=(-1.1, 1.1), params=("outline", 7)):
+    return content_key(path, xlimits, (-1.1, 1.1), params)
+
+
+def test_content_key():
+    path = demos.ring2()
+    key = _key(path)
+    assert key == _key(Path(path.vertices.copy(), path.codes.copy()))
+    assert key == _key(path, params=("outline", np.float64(7)))
+    assert key != _key(path, params=("outline", 7.5))
+    assert key != _key(path, xlimits=(-1, 1))
+    moved = path.vertices.copy()
+    moved[3] += 1e-12
+    assert key != _key(Path(moved, path.codes))
+    assert _key(path, params=(True,)) != _key(path, params=(1,))
+
+
+def test_put_get(tmp_path):
+    cache = OutlineCache(tmp_path)
+    assert cache.get("missing") is None
+    for path in (demos.ring2(), Path([[0, 0], [1, 1], [2, 0]])):
+        key = _key(path)
+        cache.put(key, path)
+        result = cache.get(key)
+        assert result is not None
+        assert_array_equal(result.vertices, path.vertices)
+        if path.codes is None:
+            assert result.codes is None
+        else:
+            assert_array_equal(result.codes, path.codes)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_evict(tmp_path):
+    cache = OutlineCache(tmp_path)
+    path = demos.ring2()
+    for j in range(3):
+        cache.put(str(j), path)
+        # make the order unambiguous whatever the resolution of mtime
+        os.utime(tmp_path / f"{j}.npz", (j, j))
+    size = (tmp_path / "0.npz").stat().st_size
+    # reading an entry marks it as recently used
+    assert cache.get("0") is not None
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert sorted(f.stem for f in tmp_path.glob("*.npz")) == ["0", "2"]
+    cache.clear()
+    assert not list(tmp_path.glob("*.npz"))
+
+
+def test_outline_disk_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def count(*args):
+        calls.append(args)
+        return original(*args)
+
+    original = knots.path._outline
+    monkeypatch.setattr(knots.path, "_outline", count)
+    cache = OutlineCache(tmp_path)
+    expected = as_outline(Knot(demos.ring2()), 7, disk_cache=cache)
+    # a new knot with the same content is found on disk
+    result = as_outline(Knot(demos.ring2()), 7, disk_cache=cache)
+    assert len(calls) == 1
+    assert_array_equal(result.vertices, expected.vertices)
+    as_outline(Knot(demos.ring2()), 9, disk_cache=cache)
+    assert len(calls) == 2
@@ -0,0 +1,31 @@
+import numpy as np
+from matplotlib.path import Path
+from numpy.testing import assert_array_equal
+
+import knots.demos as demos
+from knots.display import generate_stage3, generate_stage4
+from knots.path import Knot, as_interlaced, as_outline, crossings
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    ("generate", "outline"),
+    [(generate_stage3, as_outline), (generate_stage4, as_interlaced)],
+)
+def test_generate_fig_width(generate, outline):
+    knot = Knot(demos.ring2())
+    fig = generate(knot, 7, fig_size=(8, 8), display=False)
+    patch, _ = fig.axes[0].patches
+    expected = outline(Knot(demos.ring2()), 7, fig_width=8)
+    assert_array_equal(patch.get_path().vertices, expected.vertices)
+    assert len(expected) != len(outline(Knot(demos.ring2()), 7))
+
+
+@pytest.mark.parametrize("make_path", [demos.ring1, demos.ring2])
+def test_interlaced_cuts(make_path):
+    knot = Knot(make_path())
+    p = as_interlaced(knot, 7)
+    # the two edges of the strand going under are cut at every crossing
+    assert np.count_nonzero(p.codes == Path.MOVETO) == 2 * len(crossings(knot.path).a)
+    assert not np.any(p.codes == Path.CLOSEPOLY)
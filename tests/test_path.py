@@ -0,0 +1,440 @@
+import dataclasses
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+from numpy.testing import assert_allclose, assert_array_equal
+
+import knots.demos as demos
+import knots.path
+from knots.display import make_artist
+from knots.path import (
+    _CACHE_SIZE,
+    ArcLengthIndex,
+    Knot,
+    Pt,
+    _cached,
+    _cubic_segments,
+    _data_per_point,
+    _distance_to_polylines,
+    _eval_cubic_at,
+    _flatten_segments,
+    _path_runs,
+    as_mask,
+    as_outline,
+    crossings,
+    flatten,
+    four_fold,
+    gen_curve4,
+    join,
+    n_fold,
+    path_data_to_path,
+    path_from_arrays,
+    path_from_pts,
+    reverse,
+    topology,
+    update_four_fold,
+    update_n_fold,
+    update_path_from_arrays,
+)
+from knots.transforms import KnotTransform
+
+import pytest
+
+POINTS = [
+    (Pt(0, 0.8), 180, 0.3),
+    (Pt(-0.7, 0.15), -18, 0.5),
+    (Pt(-0.7, 0.7), 0, 0.2),
+    (Pt(0.5, -0.75), -90, 0.3),
+    (Pt(-0.8, 0), -90, 0.4),
+]
+
+
+def _path_from_gen(points, closed):
+    # the generator based implementation path_from_pts replaced
+    (start, start_angle, _), *rest = points
+    path_data = [(Path.MOVETO, start)]
+    gen = gen_curve4(start, start_angle)
+    gen.send(None)  # type: ignore[arg-type]
+    for pt in rest:
+        path_data.extend(gen.send(pt))
+    if closed:
+        path_data.extend(gen.send((start, start_angle)))
+    return path_data_to_path(path_data, closed=closed)
+
+
+@pytest.mark.parametrize("closed", [False, True])
+def test_path_from_pts(closed):
+    expected = _path_from_gen(POINTS, closed)
+    result = path_from_pts(POINTS, closed=closed)
+    assert_array_equal(result.vertices, expected.vertices)
+    assert_array_equal(result.codes, expected.codes)
+
+
+def _join_compound(*paths, close=False):
+    # the make_compound_path based implementation join replaced
+    pout = Path.make_compound_path(*paths)
+    running_total = 0
+    for p in paths[:-1]:
+        running_total += len(p.codes)
+        pout.codes[running_total] = Path.LINETO
+    if close:
+        verts = np.concatenate([pout.vertices, pout.vertices[:1]])
+        codes = np.concatenate([pout.codes, [Path.CLOSEPOLY]])
+        pout = Path(verts, codes)
+    return pout
+
+
+@pytest.mark.parametrize("close", [False, True])
+def test_join(close):
+    paths = [demos.knot1(), demos.ring2(), reverse(demos.knot1())]
+    expected = _join_compound(*paths, close=close)
+    result = join(*paths, close=close)
+    assert_array_equal(result.vertices, expected.vertices)
+    assert_array_equal(result.codes, expected.codes)
+
+
+def test_four_fold_axes():
+    # the cell does not start or end on an axis, the copies are still
+    # reflected across the axes
+    cell = Path(
+        [[0, 1], [0.3, 1], [0.6, 0.8], [0.64, 0.77]],
+        [Path.MOVETO, Path.CURVE4, Path.CURVE4, Path.CURVE4],
+    )
+    p1 = join(cell, reverse(KnotTransform().reflect(0).transform_path(cell)))
+    flip = KnotTransform().reflect(np.pi / 2)
+    expected = join(p1, reverse(flip.transform_path(p1)), close=True)
+    result = four_fold(cell)
+    assert_allclose(result.vertices, expected.vertices, atol=1e-15)
+    assert_array_equal(result.codes, expected.codes)
+
+
+def test_n_fold_off_mirror():
+    with pytest.raises(ValueError, match="mirror lines"):
+        n_fold(Path([[0, 1], [0.3, 1], [0.6, 0.8], [0.64, 0.77]]), 2)
+
+
+def _brute_force_crossings(path, tol):
+    flat = flatten(path, tol)
+    verts, codes = flat.vertices, flat.codes
+    (end,) = np.nonzero(codes[1:] != Path.MOVETO)
+    a, b = verts[end], verts[end + 1]
+    count = 0
+    for i in range(len(end)):
+        j = np.arange(i + 2, len(end))
+        # skip the edges that meet this one, including across the closing vertex
+        j = j[(np.hypot(*(b[j] - a[i]).T) > tol) & (np.hypot(*(a[j] - b[i]).T) > tol)]
+        d1 = b[i] - a[i]
+        d2 = b[j] - a[j]
+        r = a[j] - a[i]
+        den = d1[0] * d2[:, 1] - d1[1] * d2[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = (r[:, 0] * d2[:, 1] - r[:, 1] * d2[:, 0]) / den
+            t = (r[:, 0] * d1[1] - r[:, 1] * d1[0]) / den
+        count += np.count_nonzero((den != 0) & (s >= 0) & (s < 1) & (t >= 0) & (t < 1))
+    return count
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        Knot.four_fold(demos.knot1()).path,
+        demos.ring1(),
+        demos.ring2(),
+        demos.band2(),
+    ],
+)
+def test_crossings_brute_force(path):
+    tol = 1e-4 * float(np.ptp(path.vertices, axis=0).max())
+    xing = crossings(path, tol)
+    assert len(xing.a) == _brute_force_crossings(path, tol)
+    assert np.all(xing.a < xing.b)
+
+
+@pytest.mark.parametrize("closed", [False, True])
+@pytest.mark.parametrize("index", [0, 2, 4])
+def test_update_path_from_arrays(closed, index):
+    xy = np.array([p[0] for p in POINTS], dtype=float)
+    angles = np.array([p[1] for p in POINTS], dtype=float)
+    scales = np.array([p[2] for p in POINTS], dtype=float)
+    path = path_from_arrays(xy, angles, scales, closed=closed)
+    before = path.vertices.copy()
+
+    xy[index] += (0.05, -0.1)
+    angles[index] += 10
+    scales[index] *= 1.5
+    changed = update_path_from_arrays(path, xy, angles, scales, [index], closed)
+    expected = path_from_arrays(xy, angles, scales, closed=closed)
+    assert_array_equal(path.vertices, expected.vertices)
+    moved = np.nonzero(np.any(before != expected.vertices, axis=1))[0]
+    assert set(moved) <= set(changed)
+
+
+def test_update_n_fold():
+    a = np.pi / 6
+    cell = Path(
+        [[np.cos(a), np.sin(a)], [0.6, 1.0], [1.6, 0.5], [1.5, 0]],
+        [Path.MOVETO, Path.CURVE4, Path.CURVE4, Path.CURVE4],
+    )
+    path = n_fold(cell, 6)
+    cell.vertices[1:3] += (0.05, 0.1)
+    assert update_n_fold(path, cell, 6, [1, 2]) is not None
+    assert_array_equal(path.vertices, n_fold(cell, 6).vertices)
+    # moving an end may move the mirror lines
+    assert update_n_fold(path, cell, 6, [0]) is None
+
+
+def test_update_four_fold():
+    cell = demos.knot1()
+    path = four_fold(cell)
+    cell.vertices[[0, 5, -1]] += (0.05, -0.05)
+    update_four_fold(path, cell, [0, 5, len(cell.vertices) - 1])
+    expected = four_fold(cell)
+    assert_array_equal(path.vertices, expected.vertices)
+
+
+def _center_lines(knot):
+    segments, subpath, _ = _cubic_segments(knot.path)
+    seg, t = _flatten_segments(segments, 1e-6)
+    samples = _eval_cubic_at(segments, seg, t)
+    return [samples[subpath[seg] == j] for j in np.unique(subpath)]
+
+
+@pytest.mark.parametrize(
+    "make_knot",
+    [lambda: Knot(demos.ring2()), lambda: Knot.four_fold(demos.knot1())],
+)
+def test_distance_outline(make_knot):
+    knot = make_knot()
+    width = 7
+    outline = as_outline(knot, width, method="distance")
+    verts = outline.vertices[outline.codes != Path.CLOSEPOLY]
+    scale = _data_per_point(knot, 5)
+    dist = _distance_to_polylines(verts, _center_lines(knot)) / scale
+    # within half of a pixel at 200 dpi
+    assert_allclose(dist, width / 2, atol=0.5 * 72 / 200)
+    raster = as_outline(make_knot(), width, method="raster")
+    assert np.count_nonzero(outline.codes == Path.MOVETO) == np.count_nonzero(
+        raster.codes == Path.MOVETO
+    )
+
+
+def test_distance_field_reused(monkeypatch):
+    calls = []
+
+    def count(*args):
+        calls.append(args)
+        return original(*args)
+
+    original = knots.path._distance_field
+    monkeypatch.setattr(knots.path, "_distance_field", count)
+    knot = Knot(demos.ring2())
+    for width in (5, 7, 9):
+        as_outline(knot, width, method="distance")
+    assert len(calls) == 1
+
+
+def _rosette():
+    a = np.pi / 6
+    start = np.array([np.cos(a), np.sin(a)])
+    tangent = np.array([-np.sin(a), np.cos(a)])
+    cell = Path(
+        [start, start - 0.4 * tangent, [1.6, 0.5], [1.5, 0]],
+        [Path.MOVETO, Path.CURVE4, Path.CURVE4, Path.CURVE4],
+    )
+    return Knot.n_fold(cell, 6)
+
+
+@pytest.mark.parametrize(
+    "make_knot",
+    [lambda: Knot(demos.ring2()), lambda: Knot.four_fold(demos.knot1()), _rosette],
+)
+def test_vector_outline(make_knot):
+    width = 7
+    vector = as_outline(make_knot(), width, method="vector")
+    raster = as_outline(make_knot(), width, method="raster")
+    assert np.count_nonzero(vector.codes == Path.MOVETO) == np.count_nonzero(
+        raster.codes == Path.MOVETO
+    )
+    knot = make_knot()
+    scale = _data_per_point(knot, 5)
+    verts = vector.vertices[vector.codes != Path.CLOSEPOLY]
+    dist = _distance_to_polylines(verts, _center_lines(knot)) / scale
+    assert_allclose(dist, width / 2, rtol=1e-2)
+    # the raster outline is within a couple of pixels at 600 dpi
+    dist = _distance_to_polylines(raster.vertices, _path_runs(vector)) / scale
+    assert dist.max() < 2 * 72 / 600
+
+
+def test_cached_threads():
+    knot = Knot(demos.ring2())
+
+    def work(j):
+        return [_cached(knot, ("test", j, i), lambda i=i: (j, i)) for i in range(200)]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(work, range(8)))
+    assert results == [[(j, i) for i in range(200)] for j in range(8)]
+    assert len(knot._cache) == _CACHE_SIZE
+
+
+def test_mask_cache(monkeypatch):
+    calls = []
+
+    def count(*args):
+        calls.append(args)
+        return original(*args)
+
+    original = knots.path._render_mask
+    monkeypatch.setattr(knots.path, "_render_mask", count)
+    knot = Knot(demos.ring2())
+    mask = as_mask(knot, 7)
+    mask[:] = 0
+    assert np.any(as_mask(knot, 7) != 0)
+    assert len(calls) == 1
+    # a mask is about 1 MB, only keep the last two
+    monkeypatch.setattr(knots.path, "_CACHE_BYTES", 2 * mask.nbytes)
+    for width in (5, 9, 11):
+        as_mask(knot, width)
+    assert [key[1] for key in knot._cache] == [9, 11]
+    as_mask(knot, 7)
+    assert len(calls) == 5
+    knot.path = demos.ring1()
+    as_mask(knot, 7)
+    assert len(calls) == 6
+
+
+def _figure_mask(knot, width, dpi=200, fig_width=5):
+    # the Figure based implementation as_mask replaced
+    aspect_ratio = float(np.diff(knot.ylimits)[0] / np.diff(knot.xlimits)[0])
+    fig = Figure(dpi=dpi, figsize=(fig_width, fig_width * aspect_ratio))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.axis("off")
+    ax.set_aspect("equal")
+    ax.set_xlim(*knot.xlimits)
+    ax.set_ylim(*knot.ylimits)
+    ax.add_artist(make_artist(knot.path, color="k", lw=width))
+    canvas.draw()
+    return np.flipud(np.asarray(canvas.buffer_rgba())[:, :, 0])
+
+
+def test_mask_figure():
+    # the two share a pooled renderer, which must be cleared in between
+    for knot in (Knot(demos.ring2()), Knot(demos.band2()), Knot(demos.ring2())):
+        mask = as_mask(knot, 7)
+        expected = _figure_mask(knot, 7)
+        assert mask.shape == expected.shape
+        assert_allclose(mask.astype(int), expected, atol=2)
+
+
+@pytest.mark.parametrize(("method", "dpi"), [("raster", 600), ("distance", 200)])
+def test_quadrant_outline(method, dpi):
+    knot = Knot.four_fold(demos.knot1())
+    # without the symmetry the whole knot is rendered
+    full = dataclasses.replace(knot, symmetry=None)
+    result = as_outline(knot, 7, method=method)
+    expected = as_outline(full, 7, method=method)
+    assert np.count_nonzero(result.codes == Path.MOVETO) == np.count_nonzero(
+        expected.codes == Path.MOVETO
+    )
+    # the copies are joined up into closed loops
+    assert np.count_nonzero(result.codes == Path.CLOSEPOLY) == np.count_nonzero(
+        result.codes == Path.MOVETO
+    )
+    scale = _data_per_point(knot, 5)
+    dist = _distance_to_polylines(result.vertices, _path_runs(expected)) / scale
+    assert dist.max() < 72 / dpi
+
+
+@pytest.mark.parametrize("tol", [1e-2, 1e-3, 1e-4])
+@pytest.mark.parametrize("path", [demos.ring2(), demos.band2(), demos.knot1()])
+def test_flatten_tolerance(path, tol):
+    flat = flatten(path, tol)
+    assert np.all(np.isin(flat.codes, [Path.MOVETO, Path.LINETO, Path.CLOSEPOLY]))
+    lines = _path_runs(flat)
+    segments, _, _ = _cubic_segments(path)
+    t = np.linspace(0, 1, 201)
+    dense = _eval_cubic_at(
+        segments, np.repeat(np.arange(len(segments)), len(t)), np.tile(t, len(segments))
+    )
+    assert _distance_to_polylines(dense, lines).max() <= tol
+    # every vertex is on the curve (up to the flattening of the reference)
+    center = _center_lines(Knot(path))
+    assert _distance_to_polylines(flat.vertices, center).max() < 2e-6
+
+
+def test_flatten_max_step():
+    path = demos.ring2()
+    flat = flatten(path, 1e-2, max_step=0.01)
+    for line in _path_runs(flat):
+        assert np.hypot(*np.diff(line, axis=0).T).max() <= 0.01
+    assert len(flat) > len(flatten(path, 1e-2))
+
+
+def test_arc_length_line():
+    # a straight line with the control points bunched up at the ends, so the
+    # Bezier parameter is far from proportional to the arc length
+    path = Path(
+        [[0, 0], [0.1, 0], [2.9, 0], [3, 0], [3, 1], [3, 1.5], [3, 2], [3, 3]],
+        [Path.MOVETO, *[Path.CURVE4] * 3, Path.MOVETO, *[Path.CURVE4] * 3],
+    )
+    index = ArcLengthIndex(path)
+    # the jump between the sub-paths does not count
+    assert index.length == pytest.approx(5)
+    # the end of the first sub-path and the start of the second are both at 3
+    s = np.array([0, 0.5, 1.25, 2, 2.999, 3.001, 4, 4.5, 5])
+    expected = np.where(s <= 3, [s, 0 * s], [3 + 0 * s, s - 2]).T
+    # the parameter is interpolated linearly between the table entries
+    assert_allclose(index.position(s), expected, atol=1e-5)
+    assert_allclose(index.tangent([1, 4]), [[1, 0], [0, 1]], atol=1e-9)
+    assert_allclose(index.normal([1, 4]), [[0, 1], [-1, 0]], atol=1e-9)
+    # clipped to the ends
+    assert_allclose(index.position([-1, 6]), [[0, 0], [3, 3]], atol=1e-5)
+
+
+def test_arc_length_circle():
+    index = ArcLengthIndex(Path.unit_circle())
+    assert index.length == pytest.approx(2 * np.pi, rel=1e-4)
+    pts = index.position(np.linspace(0, index.length, 50))
+    assert_allclose(np.hypot(*pts.T), 1, atol=1e-3)
+    chords = np.hypot(*np.diff(pts, axis=0).T)
+    assert_allclose(chords, chords.mean(), rtol=1e-4)
+
+
+def test_topology_trefoil():
+    t = np.linspace(0, 2 * np.pi, 400)
+    trefoil = Path(
+        np.c_[np.sin(t) + 2 * np.sin(2 * t), np.cos(t) - 2 * np.cos(2 * t)],
+        closed=True,
+    )
+    topo = topology(trefoil)
+    assert topo.strands == 1
+    assert topo.crossings == 3
+    assert topo.alternating
+    (code,) = topo.gauss_code
+    assert sorted(code) == [-3, -2, -1, 1, 2, 3]
+    assert all(a * b < 0 for a, b in itertools.pairwise(code))
+
+
+@pytest.mark.parametrize(("offset", "code"), [(1, ((1, -2), (2, -1))), (3, ((), ()))])
+def test_topology_circles(offset, code):
+    # linked or not
+    path = Path.make_compound_path(Path.circle((0, 0), 1), Path.circle((offset, 0), 1))
+    assert topology(path) == (code, 2, len(code[0]), True)
+
+
+@pytest.mark.parametrize(
+    "path", [demos.ring1(), demos.ring2(), Knot.four_fold(demos.knot1()).path]
+)
+def test_topology_demos(path):
+    topo = topology(path)
+    assert topo.crossings == len(crossings(path).a)
+    # every crossing is passed once over and once under
+    signed = sorted(itertools.chain(*topo.gauss_code))
+    labels = np.arange(1, topo.crossings + 1)
+    assert signed == [*(-labels[::-1]), *labels]
+    assert topo.alternating
@@ -0,0 +1,133 @@
+import itertools
+
+import numpy as np
+import scipy.interpolate as si
+from numpy.testing import assert_allclose, assert_array_equal
+
+from knots.path import Knot, _cubic_segments, _eval_cubic_at
+from knots.spline import SplineCurve, fit_splines
+
+import pytest
+
+
+def _spline():
+    th = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+    r = 100 * (1 + 0.2 * np.sin(5 * th))
+    return SplineCurve.from_pts(
+        np.array([r * np.cos(th), r * np.sin(th)]), pix_err=0.2, need_sort=False
+    )
+
+
+def test_samples_cache():
+    sc = _spline()
+    pts = sc.samples(1000)
+    assert sc.samples(1000) is pts
+    assert not pts.flags.writeable
+    assert_allclose(pts, si.splev(np.linspace(0, 1, 1000), sc.tck))
+    assert_allclose(
+        sc.samples(50, der=1), si.splev(np.linspace(0, 1, 50), sc.tck, der=1)
+    )
+    circ = sc.circ
+    assert circ == pytest.approx(np.hypot(*np.diff(pts, axis=1)).sum())
+    assert_allclose(sc.cntr, pts.mean(axis=1))
+
+    # replacing the spline drops everything derived from it
+    t, c, k = sc.tck
+    sc.tck = (t, [2 * c[0], 2 * c[1]], k)
+    assert sc.samples(1000) is not pts
+    assert_allclose(sc.samples(1000), 2 * pts)
+    assert sc.circ == pytest.approx(2 * circ)
+
+    # only the most recent resolutions are kept
+    for n in range(10, 10 + 2 * sc._max_samples):
+        sc.samples(n)
+    assert len(sc._samples) == sc._max_samples
+
+
+def test_q_phi_to_xy_cross():
+    sc = _spline()
+    q = np.array([-3.0, 0.0, 2.0, 5.0])
+    phi = np.linspace(0, 2 * np.pi, 7)
+    result = sc.q_phi_to_xy(q, phi, cross=True)
+    assert result.shape == (2, len(q), len(phi))
+    for j, q_ in enumerate(q):
+        expected = sc.q_phi_to_xy(np.full(len(phi), q_), phi, cross=False)
+        assert_allclose(result[:, j], expected)
+    # the offset is along the unit normal
+    assert_allclose(np.hypot(*(result[:, 3] - result[:, 1])), 5)
+
+    phi2 = phi[:6].reshape(2, 3)
+    result = sc.q_phi_to_xy(q, phi2, cross=True)
+    assert result.shape == (2, len(q), 2, 3)
+    assert_allclose(result[:, :, 1], sc.q_phi_to_xy(q, phi2[1], cross=True))
+
+
+def test_bezier_segments():
+    sc = _spline()
+    t, _, k = sc.tck
+    segments = sc.bezier_segments()
+    knots = np.unique(t[k : len(t) - k])
+    assert len(segments) == len(knots) - 1
+    assert_allclose(segments[1:, 0], segments[:-1, -1], atol=1e-9)
+
+    s = np.linspace(0, 1, 11)
+    for j, (a, b) in enumerate(itertools.pairwise(knots)):
+        expected = np.array(si.splev(a + s * (b - a), sc.tck)).T
+        result = _eval_cubic_at(segments, np.full(len(s), j), s)
+        assert_allclose(result, expected, atol=1e-9)
+
+
+def test_knot_from_spline():
+    sc = _spline()
+    knot = Knot.from_spline(sc)
+    segments, _, _ = _cubic_segments(knot.path)
+    assert_allclose(segments, sc.bezier_segments(), atol=1e-9)
+
+
+def test_knot_as_spline_kwargs():
+    th = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+    pts = np.array([np.cos(th), np.sin(th)])
+    knot = Knot.as_spline(pts, description="circle", xlimits=(-2, 2))
+    assert knot.description == "circle"
+    assert knot.xlimits == (-2, 2)
+    assert knot.ylimits == Knot.as_spline(pts).ylimits
+
+
+def test_get_spline_orientation():
+    th = np.linspace(0, 2 * np.pi, 30, endpoint=False)
+    pts = np.array([10 * np.cos(th), 5 * np.sin(th)])
+    expected = SplineCurve.from_pts(pts, pix_err=0.05, need_sort=False)
+    # an ellipse with semi-axes 10 and 5
+    assert expected.circ == pytest.approx(48.44, rel=1e-2)
+    for other in (pts.T, [tuple(p) for p in pts.T]):
+        result = SplineCurve.from_pts(other, pix_err=0.05, need_sort=False)
+        assert_allclose(result.tck[1], expected.tck[1])
+        assert result.circ == pytest.approx(expected.circ)
+
+
+@pytest.mark.parametrize("shape", [(3, 10), (10, 3), (20,), (2, 5, 2)])
+def test_get_spline_bad_shape(shape):
+    with pytest.raises(ValueError, match="must be"):
+        SplineCurve.from_pts(np.ones(shape), need_sort=False)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_fit_splines(max_workers):
+    th = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+    point_sets = [
+        np.array([r * np.cos(th), r * np.sin(th) * (1 + 0.1 * r)]) for r in range(1, 8)
+    ]
+    result = fit_splines(
+        point_sets, max_workers=max_workers, chunksize=2, pix_err=0.2, need_sort=False
+    )
+    assert len(result) == len(point_sets)
+    for sc, pts in zip(result, point_sets, strict=True):
+        expected = SplineCurve.from_pts(pts, pix_err=0.2, need_sort=False)
+        for a, b in zip(sc.tck[:2], expected.tck[:2], strict=True):
+            assert_allclose(a, b)
+        assert sc.tck[2] == expected.tck[2]
+        assert sc.raw_pts is pts
+    knots = Knot.as_splines(point_sets, max_workers=max_workers)
+    assert_array_equal(
+        knots[3].path.vertices, Knot.as_spline(point_sets[3]).path.vertices
+    )
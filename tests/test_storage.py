@@ -0,0 +1,76 @@
+import json
+
+from matplotlib.path import Path
+from numpy.testing import assert_array_equal
+
+import knots.demos as demos
+from knots.path import Knot
+from knots.storage import load_catalog, save_catalog
+
+import pytest
+
+
+def _knots():
+    return [
+        Knot.four_fold(demos.knot1(), description="four fold"),
+        Knot.from_path(demos.ring2(), description="ring"),
+        Knot(Path([[0, 0], [1, 1], [2, 0]]), xlimits=(-1, 3), ylimits=(-1, 2)),
+    ]
+
+
+def _assert_paths_equal(result, expected):
+    assert_array_equal(result.vertices, expected.vertices)
+    if expected.codes is None:
+        assert result.codes is None
+    else:
+        assert_array_equal(result.codes, expected.codes)
+
+
+def test_round_trip(tmp_path):
+    knots = _knots()
+    save_catalog(knots, tmp_path)
+    catalog = load_catalog(tmp_path)
+    assert len(catalog) == len(knots)
+    for result, expected in zip(catalog, knots, strict=True):
+        _assert_paths_equal(result.path, expected.path)
+        if expected.base_path is None:
+            assert result.base_path is None
+        else:
+            _assert_paths_equal(result.base_path, expected.base_path)
+        assert result.description == expected.description
+        assert result.xlimits == pytest.approx(expected.xlimits)
+        assert result.ylimits == pytest.approx(expected.ylimits)
+        assert result.symmetry == expected.symmetry
+    assert catalog[-1].description == knots[-1].description
+    assert [k.description for k in catalog[::2]] == ["four fold", ""]
+    assert catalog[0].path.readonly
+
+
+def test_empty(tmp_path):
+    save_catalog([], tmp_path)
+    assert len(load_catalog(tmp_path)) == 0
+
+
+def test_resave_while_open(tmp_path):
+    knots = _knots()
+    save_catalog(knots, tmp_path)
+    first = load_catalog(tmp_path)
+    save_catalog(knots[1:], tmp_path)
+    # the open catalog still reads the arrays of its own save
+    assert len(first) == 3
+    _assert_paths_equal(first[0].path, knots[0].path)
+    assert len(load_catalog(tmp_path)) == 2
+    # only the arrays of the last two saves are kept
+    save_catalog(knots[2:], tmp_path)
+    assert len(list(tmp_path.glob("vertices-*.npy"))) == 2
+    assert len(list(tmp_path.glob("codes-*.npy"))) == 2
+    _assert_paths_equal(load_catalog(tmp_path)[0].path, knots[2].path)
+
+
+def test_bad_format(tmp_path):
+    save_catalog(_knots(), tmp_path)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["version"] = 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError, match="not a version"):
+        load_catalog(tmp_path)